@@ -0,0 +1,224 @@
+import argparse
+import io
+import itertools
+import json
+import os
+import time
+import wave
+
+import numpy as np
+
+from IngestCatalogue import read_metadata
+from services import AudioEncoder as audio_encoder
+from services.AudioEncoder import AudioEncoder, resample
+from services.FingerprintCache import song_key
+from services.Fingerprinter import decode_fingerprint, encode_fingerprint
+from services.LocalRecognitionService import DEFAULT_INDEX_DIR, LocalRecognitionService
+from services.Metrics import percentiles
+from services.ResultWaiter import ResultWaiter
+from services.SongDataService import SongDataService
+
+LENGTHS = [2, 3, 4, 5]  # Capture lengths in seconds
+SAMPLE_RATES = [11025, 16000, 22050]
+CODECS = ["wav", "flac", "opus", "fingerprint"]
+
+
+class OfflineBackend:
+    """Recognise against the local catalogue after a round trip through the upload encoding.
+
+    Audio codecs are encoded and decoded again, so lossy compression costs accuracy exactly as it
+    would on the server; fingerprint uploads are unpacked and searched directly.
+    """
+
+    def __init__(self, local_service, codec):
+        self.local_service = local_service
+        self.codec = codec
+        self.encoder = AudioEncoder(codec) if codec != 'fingerprint' else None
+
+    def recognize(self, audio_data, sample_rate):
+        """Return ``(result_data, bytes that would have been uploaded)``."""
+        if self.codec == 'fingerprint':
+            encoded = encode_fingerprint(audio_data, sample_rate)
+            hashes, times = decode_fingerprint(encoded.data)
+            matches = self.local_service.load_index().search(hashes, times, self.local_service.limit,
+                                                             self.local_service.min_score)
+            return {"list_result": [dict(track, score=score) for score, track in matches]}, len(encoded.data)
+
+        encoded = self.encoder.encode(audio_data, sample_rate)
+        decoded, decoded_rate = audio_encoder.sf.read(io.BytesIO(encoded.data), dtype='int16') \
+            if encoded.codec != 'wav' else (audio_data, sample_rate)
+        return self.local_service.recognize(decoded, decoded_rate), len(encoded.data)
+
+
+class RemoteBackend:
+    """Upload through ``SongDataService`` and wait for the result, as the app does."""
+
+    def __init__(self, api_url, codec, timeout=30):
+        service_options = {"api_url": api_url} if api_url else {}
+        self.service = SongDataService(encoder=AudioEncoder(codec if codec != 'fingerprint' else 'wav'),
+                                       upload_mode='fingerprint' if codec == 'fingerprint' else 'audio',
+                                       **service_options)
+        self.waiter = ResultWaiter(self.service, timeout=timeout)
+
+    def recognize(self, audio_data, sample_rate):
+        response_data = self.service.send_recording(audio_data, sample_rate)
+        sent = len(self.service.last_encoded.data)
+        if "error" in response_data:
+            return response_data, sent
+        result_data = self.waiter.wait(response_data.get("job_id"), response_data.get("token"), hints=response_data)
+        return result_data or {"error": "timed out"}, sent
+
+
+def load_manifest(manifest_path, source_dir=None, limit=None):
+    """Return ``(clip path, duration, expected song key)`` for each clip of a RecordingSamples.py manifest."""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    clips = []
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        for line in itertools.islice(manifest_file, limit):
+            record = json.loads(line)
+            # The label is the source recording, named the way IngestCatalogue.py names catalogue tracks
+            source = os.path.join(source_dir or "", record["source"])
+            clips.append((os.path.join(base_dir, record["path"]), record["duration"],
+                          song_key(read_metadata(source, 0))))
+    return clips
+
+
+def load_clip(path):
+    with wave.open(path, "rb") as wav_file:
+        samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype="<i2")
+        return samples.reshape(-1, wav_file.getnchannels())[:, 0], wav_file.getframerate()
+
+
+def hit_rank(result_data, expected_key):
+    """1-based rank of the expected song in ``list_result``, or ``None`` when it is missing."""
+    for rank, song in enumerate((result_data or {}).get("list_result") or [], 1):
+        if song_key(song) == expected_key:
+            return rank
+    return None
+
+
+def sweep(clips, backends, lengths, sample_rates):
+    """Run every clip through every ``(length, rate, codec)`` combination; returns one row per combination."""
+    configs = [(length, rate, codec) for length in lengths for rate in sample_rates for codec in backends]
+    runs = {config: {"ranks": [], "times": [], "bytes": [], "errors": 0} for config in configs}
+    started = time.perf_counter()
+    for done, (path, _, expected_key) in enumerate(clips, 1):
+        samples, clip_rate = load_clip(path)
+        for length, rate, codec in configs:
+            audio_data = resample(samples[:int(length * clip_rate)], clip_rate, rate).reshape(-1, 1)
+            run = runs[(length, rate, codec)]
+            start = time.perf_counter()
+            result_data, sent = backends[codec].recognize(audio_data, rate)
+            run["times"].append(time.perf_counter() - start)
+            run["ranks"].append(hit_rank(result_data, expected_key))
+            run["bytes"].append(sent)
+            if "error" in result_data:
+                run["errors"] += 1
+        if done % 50 == 0 or done == len(clips):
+            elapsed = time.perf_counter() - started
+            print(f"{done}/{len(clips)} clips swept ({done * len(configs) / elapsed:.1f} recognitions/s)")
+
+    rows = []
+    for (length, rate, codec), run in runs.items():
+        count = len(run["ranks"])
+        processing = percentiles(run["times"])
+        rows.append({
+            "length": length,
+            "sample_rate": rate,
+            "codec": codec,
+            "clips": count,
+            "top1": sum(rank == 1 for rank in run["ranks"]) / count if count else 0.0,
+            "top5": sum(rank is not None and rank <= 5 for rank in run["ranks"]) / count if count else 0.0,
+            "processing": processing,
+            # What the user waits for: the capture itself, then encoding, upload and the result
+            "end_to_end": {key: value + length if key != "count" and value is not None else value
+                           for key, value in processing.items()},
+            "upload_bytes": percentiles(run["bytes"]),
+            "errors": run["errors"],
+        })
+    mark_pareto(rows)
+    return rows
+
+
+def mark_pareto(rows):
+    """Flag rows no other row beats on both top-1 accuracy and median end-to-end time."""
+    for row in rows:
+        row["pareto"] = not any(
+            other["top1"] >= row["top1"] and other["end_to_end"]["p50"] <= row["end_to_end"]["p50"]
+            and (other["top1"] > row["top1"] or other["end_to_end"]["p50"] < row["end_to_end"]["p50"])
+            for other in rows)
+
+
+def recommend(rows, tolerance):
+    """The fastest combination whose top-1 rate is within ``tolerance`` of the best one."""
+    best = max(row["top1"] for row in rows)
+    return min((row for row in rows if row["top1"] >= best - tolerance), key=lambda row: row["end_to_end"]["p50"])
+
+
+def print_table(rows):
+    print(f"{'length':>7}{'rate':>7}  {'codec':<12}{'top-1':>7}{'top-5':>7}{'proc p50':>10}{'e2e p50':>9}"
+          f"{'e2e p95':>9}{'kB':>7}{'errors':>8}  pareto")
+    for row in sorted(rows, key=lambda row: row["end_to_end"]["p50"]):
+        print(f"{row['length']:>6}s{row['sample_rate']:>7}  {row['codec']:<12}{row['top1'] * 100:>6.1f}%"
+              f"{row['top5'] * 100:>6.1f}%{row['processing']['p50'] * 1000:>8.0f}ms{row['end_to_end']['p50']:>8.2f}s"
+              f"{row['end_to_end']['p95']:>8.2f}s{row['upload_bytes']['p50'] / 1024:>7.1f}{row['errors']:>8}"
+              f"  {'*' if row['pareto'] else ''}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Sweep capture length, sample rate and upload encoding against recognition accuracy and latency.")
+    parser.add_argument("manifest", help="manifest.jsonl of a labelled clip set made by RecordingSamples.py")
+    parser.add_argument("--source-dir", help="Source recordings the clips were cut from, for .json label sidecars")
+    parser.add_argument("--backend", choices=["offline", "stub", "api"], default="offline",
+                        help="offline: local catalogue (IngestCatalogue.py the sources first); stub: local stub API, "
+                             "latency only; api: the recognition API at --api-url")
+    parser.add_argument("--db", default=DEFAULT_INDEX_DIR, help=f"Catalogue for the offline backend "
+                                                                f"(default: {DEFAULT_INDEX_DIR})")
+    parser.add_argument("--api-url", default=None, help="Recognition API base URL (default: production)")
+    parser.add_argument("--lengths", default=",".join(map(str, LENGTHS)), help="Comma-separated capture lengths (s)")
+    parser.add_argument("--rates", default=",".join(map(str, SAMPLE_RATES)), help="Comma-separated sample rates")
+    parser.add_argument("--codecs", default=",".join(CODECS), help="Comma-separated upload encodings")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N clips of the manifest")
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="Top-1 loss accepted for a faster recommendation, as a fraction")
+    parser.add_argument("--output", help="Also write the rows to this JSON file")
+    args = parser.parse_args()
+
+    clips = load_manifest(args.manifest, args.source_dir, args.limit)
+    lengths = [float(length) for length in args.lengths.split(",")]
+    too_long = [length for length in lengths if length > min(duration for _, duration, _ in clips)]
+    if too_long:
+        print(f"Skipping lengths longer than the shortest clip: {too_long}")
+        lengths = [length for length in lengths if length not in too_long]
+    codecs = args.codecs.split(",")
+    if audio_encoder.sf is None and {'flac', 'opus'} & set(codecs):
+        print("soundfile is not installed; skipping flac and opus")
+        codecs = [codec for codec in codecs if codec not in ('flac', 'opus')]
+
+    stub = None
+    if args.backend == 'offline':
+        local_service = LocalRecognitionService(args.db)
+        if not local_service.is_available():
+            raise SystemExit(f"No catalogue at {args.db}; build one with IngestCatalogue.py from the source recordings")
+        backends = {codec: OfflineBackend(local_service, codec) for codec in codecs}
+    else:
+        api_url = args.api_url
+        if args.backend == 'stub':
+            from StubServer import StubRecognitionServer
+            stub = StubRecognitionServer().start()
+            api_url = stub.api_url
+        backends = {codec: RemoteBackend(api_url, codec) for codec in codecs}
+
+    rows = sweep(clips, backends, lengths, [int(rate) for rate in args.rates.split(",")])
+    if stub is not None:
+        stub.stop()
+    print_table(rows)
+    choice = recommend(rows, args.tolerance)
+    print(f"Shortest capture within {args.tolerance * 100:.0f} points of the best top-1: {choice['length']} s at "
+          f"{choice['sample_rate']} Hz, {choice['codec']} (top-1 {choice['top1'] * 100:.1f}%, "
+          f"end-to-end p50 {choice['end_to_end']['p50']:.2f} s)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(rows, output_file, indent=2)
@@ -1,104 +1,30 @@
+import json
 import os
 import sys
 import time
-import wave
-from functools import partial
-
-import requests
-import sounddevice as sd
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QBuffer, QIODevice, QUrl, QSize, QPropertyAnimation
-from PyQt5.QtGui import QFont, QPalette, QColor, QPixmap, QIcon, QPainter, QPainterPath, QMouseEvent
-from PyQt5.QtMultimedia import QMediaContent, QMediaPlayer
-from PyQt5.QtSvg import QSvgRenderer
+from collections import deque
+
+from PyQt5.QtCore import Qt, QUrl, QSize, QPropertyAnimation, QStandardPaths, QTimer, QDateTime, QRect, QRectF
+from PyQt5.QtGui import QFont, QPalette, QColor, QPixmap, QIcon, QPainter, QPainterPath, QFontMetrics
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QGraphicsDropShadowEffect, \
-    QScrollArea, QHBoxLayout, QSpacerItem, QGraphicsOpacityEffect, QStackedLayout
+    QScrollArea, QHBoxLayout, QSpacerItem, QGraphicsOpacityEffect, QStackedLayout, QListView, QStyledItemDelegate, \
+    QStyle, QAbstractItemView, QFrame, QLineEdit
 
+from models.RecognitionJob import RecognitionJob
+from models.SongListModel import PlayingRole, SongListModel, SongRole
 from models.SongMetadata import SongMetadata
-from services.SongDataService import SongDataService  # Import the service class
-
-
-class AudioRecorderThread(QThread):
-    recording_done = pyqtSignal(str)  # Signal to indicate recording is done
-    error_occurred = pyqtSignal(str)  # Signal to indicate an error occurred
-
-    def __init__(self):
-        super().__init__()
-        self.recorded_audio = None
-
-    def run(self):
-        duration = 5  # Record for 5 seconds
-        sample_rate = 22050
-
-        try:
-            # Record audio
-            audio_data = sd.rec(int(duration * sample_rate), samplerate=sample_rate, channels=1)
-            sd.wait()  # Wait for the recording to finish
-
-            # Save the recorded audio to a WAV file
-            self.recorded_audio = "recorded_audio.wav"
+from services.Metrics import metrics
+from services.ThumbnailCache import DiskCache, PixmapCache
 
-            with wave.open(self.recorded_audio, 'wb') as wav_file:
-                wav_file.setnchannels(2)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(audio_data.tobytes())
-
-            # Emit signal to indicate recording is done
-            self.recording_done.emit(self.recorded_audio)
-
-        except Exception as e:
-            # Emit signal to indicate an error occurred
-            self.error_occurred.emit(f"Failed to record audio: {str(e)}")
-
-
-class ProcessingThread(QThread):
-    processing_done = pyqtSignal(dict)  # Signal to indicate processing is done with response data
-    error_occurred = pyqtSignal(str)  # Signal to indicate an error occurred
-
-    def __init__(self, audio_file_path):
-        super().__init__()
-        self.audio_file_path = audio_file_path
-        self.service = SongDataService()  # Create an instance of the service class
-
-    def run(self):
-        if self.audio_file_path:
-            try:
-                # Send the recorded audio to the service
-                response_data = self.service.send_audio(self.audio_file_path)
-
-                if "error" in response_data:
-                    self.error_occurred.emit(response_data["error"])
-                else:
-                    # Start polling for results
-                    job_id = response_data.get("job_id")
-                    token = response_data.get("token")
-                self.poll_results(job_id, token)
-
-            except Exception as e:
-                self.error_occurred.emit(f"Failed to process audio: {str(e)}")
-        else:
-            self.error_occurred.emit("No audio recorded")
-
-    def poll_results(self, job_id, token):
-        while True:
-            result_data = self.service.get_result(job_id, token)
-
-            if "error" in result_data:
-                self.error_occurred.emit(result_data["error"])
-                return
-
-            if "list_result" in result_data and result_data["list_result"]:
-                # Emit signal with the result data
-                self.processing_done.emit(result_data)
-                return
-
-            # Wait before polling again
-            time.sleep(0.5)
+# Heavy modules (numpy, sounddevice, requests, QtMultimedia, QtSvg) are imported on first use, so
+# the window can paint before they load. MSEE_EAGER_STARTUP=1 restores building everything up front.
+EAGER_STARTUP = os.environ.get("MSEE_EAGER_STARTUP") == "1"
 
 
 class SvgBackgroundWidget(QWidget):
     def __init__(self, svg_path, parent=None):
         super().__init__(parent)
+        from PyQt5.QtSvg import QSvgRenderer
         self.renderer = QSvgRenderer(svg_path, self)
         self.opacity_effect = QGraphicsOpacityEffect(self)
         self.setGraphicsEffect(self.opacity_effect)
@@ -146,16 +72,117 @@ class CircularImageLabel(QLabel):
         painter.drawPixmap(0, 0, self.pixmap())
 
 
-# Create a ClickableWidget subclass
-class ClickableWidget(QWidget):
-    clicked = pyqtSignal()  # Custom signal
+class SongItemDelegate(QStyledItemDelegate):
+    """Paint a result row directly: circular thumbnail, title, artist, duration and a play marker.
 
-    def __init__(self, parent=None):
+    Rows have a fixed height so the view can lay out any number of them without measuring each,
+    and thumbnails come from ``thumbnail_for`` (the pixmap cache), falling back to the placeholder.
+    """
+    ROW_HEIGHT = 100
+    THUMBNAIL_SIZE = 80
+
+    def __init__(self, thumbnail_for, placeholder, parent=None):
         super().__init__(parent)
+        self.thumbnail_for = thumbnail_for  # Callable (url, size) -> cached QPixmap, or None while it loads
+        self.placeholder = placeholder.scaled(self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE,
+                                              Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+        self.title_font = QFont("Arial", 16, QFont.Bold)
+        self.detail_font = QFont("Arial", 14)
+        self.marker_font = QFont("Arial", 18)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        song = index.data(SongRole)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
 
-    def mousePressEvent(self, event: QMouseEvent):
-        if event.button() == Qt.LeftButton:
-            self.clicked.emit()  # Emit the clicked signal when the widget is clicked
+        card = option.rect.adjusted(0, 5, 0, -5)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#d6e4f7" if option.state & QStyle.State_MouseOver else "#e9f1fc"))
+        painter.drawRoundedRect(QRectF(card), 15, 15)
+
+        # Album image on the left, clipped to a circle
+        size = self.THUMBNAIL_SIZE
+        image_rect = QRect(card.left() + 10, card.center().y() - size // 2, size, size)
+        pixmap = self.thumbnail_for(song.thumbnailM, size) or self.placeholder
+        path = QPainterPath()
+        path.addEllipse(QRectF(image_rect))
+        painter.setClipPath(path)
+        painter.drawPixmap(image_rect.topLeft(), pixmap)
+        painter.setClipping(False)
+
+        # Text on the right, leaving room for the play marker
+        text_left = image_rect.right() + 15
+        text_width = card.right() - 60 - text_left
+        lines = ((self.title_font, "#2675b4", song.title),
+                 (self.detail_font, "#6c8fc2", song.artistsNames),
+                 (self.detail_font, "#6c8fc2", song.formatted_duration()))
+        y = card.top() + 8
+        for font, color, text in lines:
+            font_metrics = QFontMetrics(font)
+            painter.setFont(font)
+            painter.setPen(QColor(color))
+            painter.drawText(QRect(text_left, y, text_width, font_metrics.height()), Qt.AlignLeft | Qt.AlignVCenter,
+                             font_metrics.elidedText(text, Qt.ElideRight, text_width))
+            y += font_metrics.height() + 2
+
+        if index.data(PlayingRole):
+            marker = QRect(card.right() - 50, card.center().y() - 20, 40, 40)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#2675b4"))
+            painter.drawEllipse(marker)
+            painter.setFont(self.marker_font)
+            painter.setPen(QColor("#ffffff"))
+            painter.drawText(marker, Qt.AlignCenter, "▶")
+
+        painter.restore()
+
+
+class HistoryWindow(QWidget):
+    """Searchable list of everything recognised on this machine, newest first.
+
+    Rows come from a ``HistoryListModel`` that pages entries in from the store as they scroll into
+    view, so the window opens at once however long the history is.
+    """
+
+    def __init__(self, model, thumbnail_for, placeholder, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.model = model
+        self.setWindowTitle("Msee – Lịch sử")
+        self.resize(420, 640)
+        layout = QVBoxLayout(self)
+
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("Tìm theo tên bài hát hoặc ca sĩ")
+        self.search_edit.setFont(QFont("Arial", 14))
+        layout.addWidget(self.search_edit)
+
+        # Re-query once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.refresh)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+
+        self.count_label = QLabel("", self)
+        self.count_label.setFont(QFont("Arial", 12))
+        self.count_label.setStyleSheet("color: #6c8fc2;")
+        layout.addWidget(self.count_label)
+
+        self.view = QListView(self)
+        self.view.setModel(model)
+        self.view.setItemDelegate(SongItemDelegate(thumbnail_for, placeholder, self.view))
+        self.view.setUniformItemSizes(True)
+        self.view.setMouseTracking(True)
+        self.view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.view.setFrameShape(QFrame.NoFrame)
+        layout.addWidget(self.view)
+
+    def refresh(self):
+        self.model.refresh(self.search_edit.text().strip())
+        self.count_label.setText(f"{self.model.rowCount()} bài hát")
 
 
 def get_asset_path(relative_path):
@@ -166,8 +193,14 @@ def get_asset_path(relative_path):
 
 
 class ShazamCloneApp(QWidget):
-    def __init__(self):
+    PREFETCH_PREVIEWS = 10  # Results whose preview start is fetched ahead of a click
+
+    def __init__(self, lazy_startup=None):
         super().__init__()
+        self.lazy_startup = not EAGER_STARTUP if lazy_startup is None else lazy_startup
+        self.ready = False  # Set once services and workers exist and the record button works
+        self.startup_scheduled = False
+        self.startup_marks = {}
 
         # Set up the window
         self.setWindowTitle('Msee')
@@ -248,9 +281,201 @@ class ShazamCloneApp(QWidget):
         self.thinner_label.hide()
         button_layout.addWidget(self.thinner_label, alignment=Qt.AlignCenter)
 
+        # Link to the recognition history, kept below the listening labels
+        self.history_button = QPushButton("Lịch sử nhận diện", self)
+        self.history_button.setFlat(True)
+        self.history_button.setCursor(Qt.PointingHandCursor)
+        self.history_button.setStyleSheet("color: #2675b4; text-decoration: underline; font-size: 14px; border: none;")
+        self.history_button.setEnabled(False)
+        self.history_button.clicked.connect(self.show_history)
+        button_layout.addWidget(self.history_button, alignment=Qt.AlignCenter)
+
         # Add the non-scrollable button container to the main layout
         main_layout_container.addWidget(self.button_container)
 
+        # The results section (header, song info, extra songs, timeline) is built on first use
+        self.default_album_image = get_asset_path("assets/default_album.jpg")
+        self.main_layout_container = main_layout_container
+        self.results_ui_built = False
+
+        # Set the layout for the main window
+        self.setLayout(main_layout_container)
+
+        # Add to stacked layout
+        stacked_layout.addWidget(main_widget)
+
+        # Ensure the pulse container is in the background
+        stacked_layout.setCurrentIndex(1)
+
+        # QMediaPlayer is created on the first preview. Previews play from a local cache that the
+        # preview loader fills with the start of every result's mp3 as soon as results arrive.
+        self.media_player = None
+        self.preview_loader = None
+        self.playing_mp3_url = None  # Preview currently loaded in the player
+        self.playing_partial = False  # Whether the player holds only the cached start of it
+        self.awaiting_preview = False  # Whether playback waits for the download to start or go on
+
+        # Album art is fetched and decoded concurrently off the GUI thread, backed by a disk cache
+        # of downloaded images and an in-memory LRU of pixmaps already scaled for their label
+        self.pixmap_cache = PixmapCache()
+        self.thumbnail_loader = None
+        self.pending_thumbnails = {}  # URL -> labels waiting for that image
+        self.pending_row_thumbnails = {}  # URL -> thumbnail size wanted by the result list
+        self.failed_thumbnails = set()
+
+        # Initialize variables to handle audio state
+        self.is_paused = True
+        self.current_mp3_url = None
+
+        # Audio-related variables
+        self.recorded_audio = None
+
+        # Submit partial clips while recording and stop at the first confident match
+        self.streaming_mode = True
+
+        # Keep listening and follow track changes instead of recognising a single clip (monitoring screens)
+        self.continuous_mode = False
+        self.timeline = deque(maxlen=500)  # (time, song) for each track change, oldest dropped first
+        self.timeline_visible_entries = 10
+        self.current_job = None  # Only results for this job reach the UI
+        self.listen_started = None  # Monotonic time of the last press, for the latency kept in the history
+
+        # Every identified song is logged to a local SQLite history; its window is built on first use
+        self.history_store = None
+        self.history_model = None
+        self.history_window = None
+
+        # The record button stays disabled until the services behind it exist
+        self.record_button.setEnabled(False)
+        if not self.lazy_startup:
+            self.build_results_ui()
+            self.finish_startup()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.startup_scheduled:
+            # Runs once the whole first frame has been painted
+            self.startup_scheduled = True
+            QTimer.singleShot(0, self.after_first_paint)
+
+    def after_first_paint(self):
+        self.record_startup_mark("first_paint")
+        self.finish_startup()
+
+    def record_startup_mark(self, name):
+        """Note when a startup milestone was reached; with both in and MSEE_STARTUP_REPORT set, report and quit."""
+        if name in self.startup_marks:
+            return
+        self.startup_marks[name] = time.time()
+        report_path = os.environ.get("MSEE_STARTUP_REPORT")
+        if report_path and {"first_paint", "ready"} <= self.startup_marks.keys():
+            report = dict(self.startup_marks, lazy_startup=self.lazy_startup)
+            with open(report_path, "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file)
+            QTimer.singleShot(0, QApplication.quit)
+
+    def finish_startup(self):
+        """Import the heavy modules and create the services and recognition workers."""
+        if self.ready:
+            return
+        from services.AudioEncoder import AudioEncoder
+        from services.AudioGate import AudioGate
+        from services.AudioInput import AudioInput
+        from services.FingerprintCache import FingerprintCache
+        from services.HistoryStore import HistoryStore
+        from services.LocalRecognitionService import LocalRecognitionService
+        from services.PreviewLoader import PreviewLoader
+        from services.RecognitionWorkers import AudioRecorderThread, ContinuousRecognitionThread, \
+            ProcessingThread, StreamingRecognitionThread
+        from services.SongDataService import SongDataService
+        from services.ThumbnailLoader import ThumbnailLoader
+
+        cache_dir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), "thumbnails")
+        self.thumbnail_loader = ThumbnailLoader(disk_cache=DiskCache(cache_dir), parent=self)
+        self.thumbnail_loader.thumbnail_loaded.connect(self.on_thumbnail_loaded)
+        self.thumbnail_loader.thumbnail_failed.connect(self.on_thumbnail_failed)
+
+        preview_dir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), "previews")
+        self.preview_loader = PreviewLoader(DiskCache(preview_dir, max_bytes=100 * 1024 * 1024, suffix=".mp3"),
+                                            parent=self)
+        self.preview_loader.preview_cached.connect(self.on_preview_cached)
+        self.preview_loader.preview_failed.connect(self.on_preview_failed)
+
+        # Single service instance so every recognition reuses its pooled keep-alive connections.
+        # The codec follows the measured uplink: Opus on slow links, FLAC on moderate ones, WAV on fast ones.
+        self.song_data_service = SongDataService(encoder=AudioEncoder(codec='auto'))
+
+        # Recently recognised songs, matched by fingerprint so repeat presses skip the network
+        self.fingerprint_cache = FingerprintCache()
+
+        # Flush pipeline metrics periodically while instrumentation is enabled
+        if metrics.enabled:
+            self.metrics_timer = QTimer(self)
+            self.metrics_timer.timeout.connect(metrics.export)
+            self.metrics_timer.start(15000)
+
+        # Offline catalogue index (built with IngestCatalogue.py), used when the API is slow or unreachable
+        self.local_service = LocalRecognitionService()
+
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+        os.makedirs(data_dir, exist_ok=True)
+        self.history_store = HistoryStore(os.path.join(data_dir, "history.sqlite3"))
+        self.history_store.committed.connect(self.on_history_committed)
+
+        # Silent, noisy or speech-only captures are turned away locally instead of costing a round trip
+        self.audio_gate = AudioGate()
+
+        # Microphone stream opened once and kept running, so pressing record never waits on the device
+        # and a capture can include the moment just before the press
+        self.audio_input = AudioInput()
+        try:
+            self.audio_input.start()
+        except Exception as e:
+            print(f"Audio input not available yet: {e}")  # Retried when a capture starts
+
+        # Create threads
+        self.audio_recorder_thread = AudioRecorderThread(gate=self.audio_gate, audio_input=self.audio_input)
+        # Stop at a prefix whose top match has this many aligned landmark hashes (the score the catalogue
+        # search reports); without a score, two prefixes have to agree
+        self.streaming_thread = StreamingRecognitionThread(min_score=20, audio_input=self.audio_input,
+                                                           service=self.song_data_service,
+                                                           fingerprint_cache=self.fingerprint_cache,
+                                                           fallback_service=self.local_service,
+                                                           gate=self.audio_gate)
+        self.continuous_thread = ContinuousRecognitionThread(audio_input=self.audio_input,
+                                                             service=self.song_data_service,
+                                                             fingerprint_cache=self.fingerprint_cache,
+                                                             fallback_service=self.local_service,
+                                                             gate=self.audio_gate)
+        # One long-lived worker handles every clip-based recognition
+        self.processing_thread = ProcessingThread(service=self.song_data_service,
+                                                  fingerprint_cache=self.fingerprint_cache,
+                                                  fallback_service=self.local_service)
+
+        # Connect signals
+        self.audio_recorder_thread.recording_done.connect(self.start_processing)
+        self.audio_recorder_thread.error_occurred.connect(self.show_error)
+        self.audio_recorder_thread.clip_rejected.connect(self.on_clip_rejected)
+        self.streaming_thread.recording_done.connect(self.on_recording_done)
+        for worker in (self.streaming_thread, self.processing_thread):
+            worker.processing_done.connect(self.on_processing_done)
+            worker.error_occurred.connect(self.on_processing_error)
+            worker.timed_out.connect(self.on_timed_out)
+        self.continuous_thread.song_changed.connect(self.on_song_changed)
+        self.continuous_thread.error_occurred.connect(self.on_processing_error)
+
+        self.ready = True
+        self.record_button.setEnabled(True)
+        self.history_button.setEnabled(True)
+        self.record_startup_mark("ready")
+        if self.continuous_mode:
+            self.start_listening()
+
+    def build_results_ui(self):
+        if self.results_ui_built:
+            return
+        self.results_ui_built = True
+
         # Create a sticky header widget
         self.header_widget = QWidget()
         self.header_layout = QVBoxLayout(self.header_widget)
@@ -265,7 +490,7 @@ class ShazamCloneApp(QWidget):
         self.header_layout.addWidget(self.sticky_label)
 
         # Add the header widget to the main layout
-        main_layout_container.addWidget(self.header_widget)
+        self.main_layout_container.addWidget(self.header_widget)
 
         # Scrollable container for song info and extra songs
         self.scroll_area = QScrollArea()
@@ -324,7 +549,6 @@ class ShazamCloneApp(QWidget):
         self.song_info_layout.setContentsMargins(20, 20, 20, 20)
 
         self.song_image_label = CircularImageLabel(self)
-        self.default_album_image = get_asset_path("assets/default_album.jpg")
         self.song_image_label.setFixedSize(150, 150)
         self.song_image_label.setPixmap(QPixmap(self.default_album_image))
         self.song_image_label.setAlignment(Qt.AlignCenter)
@@ -404,45 +628,52 @@ class ShazamCloneApp(QWidget):
         self.extra_songs_layout = QVBoxLayout(self.extra_songs_widget)
         self.extra_songs_widget.setStyleSheet("background-color: #ffffff;")
         self.extra_songs_widget.hide()
-        self.current_playing_button = None
+        self.current_playing_row = None
+
+        # Create the header label for the extra songs section
+        extra_songs_header = QLabel("Tất cả kết quả nhận diện:", self)
+        extra_songs_header.setFont(QFont("Arial", 16, QFont.Bold))
+        extra_songs_header.setStyleSheet("color: #2675b4; padding-bottom: 10px;")
+        extra_songs_header.setAlignment(Qt.AlignLeft)
+        self.extra_songs_layout.addWidget(extra_songs_header)
+
+        # Results are rows in a model painted by a delegate, so the list costs the same for 5 or 500 songs
+        self.extra_songs_model = SongListModel(self)
+        self.extra_songs_view = QListView(self)
+        self.extra_songs_view.setModel(self.extra_songs_model)
+        self.extra_songs_view.setItemDelegate(SongItemDelegate(self.thumbnail_for, QPixmap(self.default_album_image),
+                                                               self.extra_songs_view))
+        self.extra_songs_view.setUniformItemSizes(True)
+        self.extra_songs_view.setMouseTracking(True)
+        self.extra_songs_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.extra_songs_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.extra_songs_view.setFrameShape(QFrame.NoFrame)
+        self.extra_songs_view.setFixedWidth(360)
+        self.extra_songs_view.clicked.connect(self.on_extra_song_clicked)
+        self.extra_songs_visible_rows = 5  # Taller lists scroll inside the view
+        self.extra_songs_layout.addWidget(self.extra_songs_view)
 
         # Add the extra songs widget to the scrollable layout
         scrollable_layout.addWidget(self.extra_songs_widget, alignment=Qt.AlignCenter)
 
+        # Timeline of songs identified in continuous mode (hidden until the first one)
+        self.timeline_label = QLabel("", self)
+        self.timeline_label.setFont(QFont("Arial", 14))
+        self.timeline_label.setStyleSheet("color: #2675b4; padding-top: 10px;")
+        self.timeline_label.setAlignment(Qt.AlignLeft)
+        self.timeline_label.hide()
+        scrollable_layout.addWidget(self.timeline_label, alignment=Qt.AlignCenter)
+
         # Set the scrollable widget inside the scroll area
         self.scroll_area.setWidget(scrollable_widget)
 
         # Add the scrollable area to the main layout
-        main_layout_container.addWidget(self.scroll_area)
-
-        # Set the layout for the main window
-        self.setLayout(main_layout_container)
-
-        # Add to stacked layout
-        stacked_layout.addWidget(main_widget)
-
-        # Ensure the pulse container is in the background
-        stacked_layout.setCurrentIndex(1)
-
-        # Initialize QMediaPlayer
-        self.media_player = QMediaPlayer()
-
-        # Initialize variables to handle audio state
-        self.is_paused = True
-        self.current_mp3_url = None
-
-        # Audio-related variables
-        self.recorded_audio = None
-
-        # Create threads
-        self.audio_recorder_thread = AudioRecorderThread()
-        self.processing_thread = None
-
-        # Connect signals
-        self.audio_recorder_thread.recording_done.connect(self.start_processing)
-        self.audio_recorder_thread.error_occurred.connect(self.show_error)
+        self.main_layout_container.addWidget(self.scroll_area)
 
     def start_listening(self):
+        if not self.ready:
+            return  # Still starting up; the record button is disabled until then
+
         # Clear previous song info
         self.clear_song_info()
 
@@ -452,21 +683,114 @@ class ShazamCloneApp(QWidget):
         self.below_button_label.show()
         self.thinner_label.show()
 
+        # Abandon any recognition still in flight; its late results are ignored
+        self.cancel_recognition()
+        self.listen_started = time.monotonic()
+
         # Start the recording thread
-        self.audio_recorder_thread.start()
+        if self.continuous_mode:
+            # Runs until cancelled, so the job has no deadline of its own
+            self.current_job = RecognitionJob(sample_rate=self.continuous_thread.sample_rate, timeout=float('inf'))
+            self.continuous_thread.submit(self.current_job)
+        elif self.streaming_mode:
+            self.current_job = RecognitionJob(sample_rate=self.streaming_thread.sample_rate)
+            self.streaming_thread.submit(self.current_job)
+        else:
+            self.current_job = RecognitionJob()
+            self.audio_recorder_thread.start()
+
+    def cancel_recognition(self):
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.current_job = None
 
-    def start_processing(self, audio_file_path):
+    def is_current_job(self, job_id):
+        return self.current_job is not None and self.current_job.id == job_id
+
+    def show_processing_state(self):
         # Update UI to show processing state
         self.below_button_label.setText("Đang nhận diện bài hát")
         self.thinner_label.setText("Vui lòng chờ trong giây lát...")
 
-        # Start the processing thread
-        self.processing_thread = ProcessingThread(audio_file_path)
-        self.processing_thread.processing_done.connect(self.handle_response)
-        self.processing_thread.error_occurred.connect(self.show_error)
-        self.processing_thread.start()
-
-    def handle_response(self, response_data):
+    def start_processing(self, audio_data, sample_rate):
+        job = self.current_job
+        if job is None or job.is_cancelled():
+            return  # Recognition was abandoned while recording
+        self.show_processing_state()
+
+        # Hand the clip to the persistent worker
+        job.audio_data = audio_data
+        job.sample_rate = sample_rate
+        self.processing_thread.submit(job)
+
+    def on_clip_rejected(self, reason):
+        # Rejected right after capture, so the user never sees the recognising state
+        if self.current_job is not None:
+            self.cancel_recognition()
+            self.show_error(reason)
+
+    def on_recording_done(self, job_id):
+        if self.is_current_job(job_id):
+            self.show_processing_state()
+
+    def on_processing_done(self, job_id, response_data):
+        if self.is_current_job(job_id):
+            self.current_job = None
+            self.handle_response(response_data)
+            self.record_history(response_data, time.monotonic() - self.listen_started)
+
+    def on_processing_error(self, job_id, error_message):
+        if self.is_current_job(job_id):
+            self.current_job = None
+            self.show_error(error_message)
+
+    def on_timed_out(self, job_id):
+        if self.is_current_job(job_id):
+            self.current_job = None
+            self.show_timeout()
+
+    def on_song_changed(self, job_id, response_data):
+        # The continuous job keeps running; only the display and timeline change
+        if not self.is_current_job(job_id):
+            return
+        self.clear_song_info()
+        self.handle_response(response_data, autoplay=False)  # A preview would feed back into the microphone
+        self.add_timeline_entry(response_data["list_result"][0])
+        self.record_history(response_data)  # Listening has no single press to measure latency from
+
+    def add_timeline_entry(self, song):
+        self.build_results_ui()
+        self.timeline.append((QDateTime.currentDateTime(), song))
+        recent = list(self.timeline)[-self.timeline_visible_entries:]
+        lines = [f"{when.toString('HH:mm')}  {entry.get('title', 'Unknown')} – {entry.get('artistsNames', 'Unknown')}"
+                 for when, entry in reversed(recent)]
+        self.timeline_label.setText("Đã phát:\n" + "\n".join(lines))
+        self.timeline_label.show()
+
+    def record_history(self, response_data, latency=None):
+        if response_data.get("list_result"):
+            self.history_store.add(response_data["list_result"][0], latency)
+            if self.history_window is not None and self.history_window.isVisible():
+                self.history_store.flush()  # Shown from on_history_committed once written
+
+    def show_history(self):
+        if self.history_window is None:
+            from models.HistoryListModel import HistoryListModel
+            self.history_model = HistoryListModel(self.history_store, parent=self)
+            self.history_window = HistoryWindow(self.history_model, self.thumbnail_for,
+                                                QPixmap(self.default_album_image), self)
+        self.history_window.refresh()
+        self.history_window.show()
+        self.history_window.raise_()
+        self.history_store.flush()  # Results still queued show up once written, from on_history_committed
+
+    def on_history_committed(self, count):
+        if self.history_window is not None and self.history_window.isVisible():
+            self.history_window.refresh()
+
+    @metrics.timed("handle_response")
+    def handle_response(self, response_data, autoplay=True):
+        self.build_results_ui()
         if "list_result" in response_data and response_data["list_result"]:
             # Map the first result to SongMetadata
             first_result = response_data["list_result"][0]
@@ -505,7 +829,12 @@ class ShazamCloneApp(QWidget):
 
             # Set the play button only if mp3_url is available
             self.current_mp3_url = song_metadata.mp3url
-            self.play_audio(song_metadata.mp3url)
+            if autoplay:
+                self.play_audio(song_metadata.mp3url)
+
+            # Fetch the start of the other previews now, so switching between them is instant
+            self.preview_loader.prefetch(
+                result.get('mp3url', '') for result in response_data["list_result"][:self.PREFETCH_PREVIEWS])
 
             # Check if extra songs are available
             if len(response_data.get("list_result", [])) > 1:
@@ -513,104 +842,11 @@ class ShazamCloneApp(QWidget):
                 self.reveal_link.show()
                 self.toggle_extra_songs_button.show()
 
-                # Populate the extra songs section
+                # Populate the extra songs section with however many results came back
                 list_result = response_data["list_result"]
-
-                # Create the header label for the extra songs section
-                extra_songs_header = QLabel("Tất cả kết quả nhận diện:", self)
-                extra_songs_header.setFont(QFont("Arial", 16, QFont.Bold))
-                extra_songs_header.setStyleSheet("color: #2675b4; padding-bottom: 10px;")
-                extra_songs_header.setAlignment(Qt.AlignLeft)
-                self.extra_songs_layout.addWidget(extra_songs_header)
-
-                # Ensure we only display up to 4 extra songs
-                for i in range(0, 5):
-                    song = SongMetadata(
-                        title=list_result[i].get('title', 'Unknown'),
-                        artistsNames=list_result[i].get('artistsNames', 'Unknown'),
-                        category=list_result[i].get('category', 'Unknown'),
-                        duration=list_result[i].get('duration', 0),
-                        link=list_result[i].get('link', ''),
-                        releaseDate=list_result[i].get('releaseDate', 0),
-                        thumbnailM=list_result[i].get('thumbnailM', self.default_album_image),
-                        mp3url=list_result[i].get('mp3url', '')
-                    )
-
-                    # Create a container widget with horizontal layout
-                    container_widget = ClickableWidget(self)
-                    container_widget.setStyleSheet("""
-                            QWidget {
-                                background-color: #e9f1fc;
-                                border-radius: 15px;
-                            }
-                        """)
-                    h_layout = QHBoxLayout(container_widget)
-                    h_layout.setContentsMargins(10, 10, 10, 10)
-
-                    # Download the image
-                    response = requests.get(song.thumbnailM)
-                    response.raise_for_status()  # Raise an exception for HTTP errors
-
-                    # Create a QPixmap from the image data
-                    image_data = QBuffer()
-                    image_data.setData(response.content)
-                    image_data.open(QIODevice.ReadOnly)
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(response.content)
-
-                    # Album image on the left
-                    album_image_label = CircularImageLabel(self)
-                    album_image_label.setPixmap(QPixmap(pixmap))
-                    album_image_label.setFixedSize(80, 80)
-                    album_image_label.setAlignment(Qt.AlignCenter)
-                    album_image_label.setStyleSheet("""
-                            QLabel {
-                                border-radius: 40px;
-                            }
-                        """)
-                    h_layout.addWidget(album_image_label)
-
-                    # Text on the right
-                    text_layout = QVBoxLayout()
-                    text_layout.setContentsMargins(0, 0, 0, 0)
-
-                    title_label = QLabel(song.title, self)
-                    title_label.setFont(QFont("Arial", 16, QFont.Bold))
-                    title_label.setStyleSheet("color: #2675b4; background: transparent;")
-                    text_layout.addWidget(title_label)
-
-                    artist_label = QLabel(song.artistsNames, self)
-                    artist_label.setFont(QFont("Arial", 14))
-                    artist_label.setStyleSheet("color: #6c8fc2; background: transparent;")  # Muted color
-                    text_layout.addWidget(artist_label)
-
-                    duration_label = QLabel(song.formatted_duration(), self)
-                    duration_label.setFont(QFont("Arial", 14))
-                    duration_label.setStyleSheet("color: #6c8fc2; background: transparent;")  # Muted color
-                    text_layout.addWidget(duration_label)
-
-                    h_layout.addLayout(text_layout)
-
-                    # Add play button beside each song
-                    play_button = QPushButton("▶", self)
-                    play_button.setFixedSize(40, 40)
-                    play_button.setStyleSheet("""\
-                            QPushButton {
-                                background-color: #2675b4;
-                                border-radius: 20px; /* Half of the height/width */
-                                color: #ffffff;
-                                font-size: 18px;
-                            }
-                            QPushButton:hover {
-                                background-color: #1a5e9c;
-                            }
-                        """)
-                    play_button.hide()
-                    container_widget.clicked.connect(partial(self.play_audio, song.mp3url, play_button))
-                    h_layout.addWidget(play_button)
-
-                    # Add the container widget to the extra songs layout
-                    self.extra_songs_layout.addWidget(container_widget)
+                self.extra_songs_model.set_results(list_result)
+                visible_rows = min(len(list_result), self.extra_songs_visible_rows)
+                self.extra_songs_view.setFixedHeight(visible_rows * SongItemDelegate.ROW_HEIGHT + 2)
 
                 # Show the extra songs widget
                 self.extra_songs_widget.setVisible(False)
@@ -633,70 +869,180 @@ class ShazamCloneApp(QWidget):
         self.thinner_label.setText("Cố gắng giữ im lặng để Msee lắng nghe")
         self.thinner_label.hide()
 
-    def play_audio(self, mp3_url=None, button=None):
+    def on_extra_song_clicked(self, index):
+        self.play_audio(self.extra_songs_model.song(index.row()).mp3url, index.row())
+
+    def get_media_player(self):
+        if self.media_player is None:
+            from PyQt5.QtMultimedia import QMediaPlayer
+            self.media_player = QMediaPlayer()
+            self.media_player.mediaStatusChanged.connect(self.on_media_status_changed)
+        return self.media_player
+
+    def set_preview_media(self, mp3_url):
+        """Load a preview from the local cache, downloading it first when none of it is there.
+
+        The player never streams a URL the loader is also downloading, so each byte is fetched once.
+        """
+        from PyQt5.QtMultimedia import QMediaContent
+        source = self.preview_loader.local_source(mp3_url) if self.preview_loader and mp3_url else None
+        self.playing_mp3_url = mp3_url
+        self.playing_partial = source is not None and not source[1]
+        self.awaiting_preview = False
+        if self.preview_loader is not None and mp3_url:
+            if source is None:
+                # Fetch the start and play it from disk once it lands (on_preview_cached)
+                self.awaiting_preview = True
+                self.media_player.setMedia(QMediaContent())
+                self.preview_loader.prefetch([mp3_url])
+                return
+            if not source[1]:
+                self.preview_loader.fetch_rest(mp3_url)  # Completed in the background while the start plays
+        media_url = QUrl.fromLocalFile(source[0]) if source is not None else QUrl(mp3_url)
+        self.media_player.setMedia(QMediaContent(media_url))
+
+    def switch_preview_source(self, media_url):
+        """Swap the playing preview to another copy of the same file without losing its position."""
+        from PyQt5.QtMultimedia import QMediaContent
+        position = self.media_player.position()
+        self.media_player.setMedia(QMediaContent(media_url))
+        self.media_player.setPosition(position)
+        if not self.is_paused:
+            self.media_player.play()
+
+    def on_preview_cached(self, mp3_url, complete):
+        if mp3_url != self.playing_mp3_url or not (self.awaiting_preview or complete and self.playing_partial):
+            return
+        source = self.preview_loader.local_source(mp3_url)
+        if source is None:
+            return
+        self.awaiting_preview = False
+        self.playing_partial = not source[1]
+        if self.playing_partial:
+            self.preview_loader.fetch_rest(mp3_url)
+        self.switch_preview_source(QUrl.fromLocalFile(source[0]))
+
+    def on_preview_failed(self, mp3_url, error_message):
+        print(f"Failed to prefetch preview: {error_message}")
+        if mp3_url == self.playing_mp3_url and (self.awaiting_preview or self.playing_partial):
+            # The download is gone, so stream the preview instead (from where playback stopped)
+            self.awaiting_preview = False
+            self.playing_partial = False
+            self.switch_preview_source(QUrl(mp3_url))
+
+    def on_media_status_changed(self, status):
+        from PyQt5.QtMultimedia import QMediaPlayer
+        if status == QMediaPlayer.EndOfMedia and self.playing_partial:
+            # The cached start ran out before the rest arrived; on_preview_cached resumes from the full file
+            self.awaiting_preview = True
+
+    def play_audio(self, mp3_url=None, row=None):
         if mp3_url is not None:
-            if button is not None:
-                if self.current_playing_button is not None:
-                    if self.current_playing_button == button:
-                        # Toggle play/pause if the same button is pressed
+            self.get_media_player()
+            if row is not None:
+                if self.current_playing_row is not None:
+                    if self.current_playing_row == row:
+                        # Toggle play/pause if the same row is pressed
                         if self.is_paused is False:
                             self.media_player.pause()
-                            button.hide()
+                            self.extra_songs_model.set_playing_row(None)
                             self.is_paused = True
                         else:
                             self.media_player.play()
-                            button.show()
+                            self.extra_songs_model.set_playing_row(row)
                             self.is_paused = False
                     else:
-                        # Pause the previously playing button
+                        # Pause the previously playing row
                         self.media_player.pause()
-                        self.current_playing_button.hide()
-                        self.current_playing_button = button
-                        self.media_player.setMedia(QMediaContent(QUrl(mp3_url)))
+                        self.current_playing_row = row
+                        self.set_preview_media(mp3_url)
                         self.media_player.play()
-                        button.show()
+                        self.extra_songs_model.set_playing_row(row)
                         self.is_paused = False
                 else:
-                    # Play the new audio and set the current button
-                    self.current_playing_button = button
-                    self.media_player.setMedia(QMediaContent(QUrl.fromLocalFile(mp3_url)))
+                    # Play the new audio and set the current row
+                    self.current_playing_row = row
+                    self.set_preview_media(mp3_url)
                     self.media_player.play()
-                    button.show()
+                    self.extra_songs_model.set_playing_row(row)
                     self.is_paused = False
             else:
-                self.media_player.setMedia(QMediaContent(QUrl.fromLocalFile(mp3_url)))
+                self.set_preview_media(mp3_url)
                 self.media_player.play()
                 self.is_paused = False
         else:
             # Stop audio if no URL is provided
-            self.media_player.stop()
-            if self.current_play_button is not None:
-                self.current_play_button.hide()
+            if self.media_player is not None:
+                self.media_player.stop()
+            self.extra_songs_model.set_playing_row(None)
             self.is_paused = True
             self.current_mp3_url = None
-            self.current_playing_button = None
+            self.current_playing_row = None
+            self.playing_mp3_url = None
 
+    @metrics.timed("set_album_image")
     def set_album_image(self, image_url):
-        try:
-            # Download the image
-            response = requests.get(image_url)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-
-            # Create a QPixmap from the image data
-            image_data = QBuffer()
-            image_data.setData(response.content)
-            image_data.open(QIODevice.ReadOnly)
-            pixmap = QPixmap()
-            pixmap.loadFromData(response.content)
-
-            # Set the pixmap to the label
-            self.song_image_label.setPixmap(pixmap)
-            self.song_image_label.show()
-
-        except Exception as e:
-            print(f"Failed to load image: {e}")
-            self.song_image_label.setPixmap(QPixmap(self.default_album_image).scaled(150, 150, Qt.KeepAspectRatio))
-            self.song_image_label.show()
+        # Show the placeholder right away; the thumbnail is swapped in once the loader delivers it
+        self.song_image_label.setPixmap(QPixmap(self.default_album_image))
+        self.song_image_label.show()
+        self.request_thumbnail(image_url, self.song_image_label)
+
+    def request_thumbnail(self, image_url, label):
+        if not image_url or image_url == self.default_album_image:
+            return
+        pixmap = self.pixmap_cache.get((image_url, label.width()))
+        if pixmap is not None:
+            label.setPixmap(pixmap)
+            return
+        labels = self.pending_thumbnails.setdefault(image_url, [])
+        labels.append(label)
+        if len(labels) == 1 and image_url not in self.pending_row_thumbnails:
+            self.thumbnail_loader.load(image_url)
+
+    def thumbnail_for(self, image_url, size):
+        """Pixmap for a list row at ``size``, or ``None`` while it loads (the request is made here)."""
+        if not image_url or image_url == self.default_album_image or image_url in self.failed_thumbnails:
+            return None
+        if image_url in self.pending_row_thumbnails:
+            return None
+        pixmap = self.pixmap_cache.get((image_url, size))
+        if pixmap is None:
+            self.pending_row_thumbnails[image_url] = size
+            if image_url not in self.pending_thumbnails:
+                self.thumbnail_loader.load(image_url)
+        return pixmap
+
+    def on_thumbnail_loaded(self, image_url, image):
+        # Results cleared in the meantime have no pending labels left
+        pixmap = QPixmap.fromImage(image)
+        scaled_by_width = {}
+        for label in self.pending_thumbnails.pop(image_url, []):
+            if label.width() not in scaled_by_width:
+                scaled = pixmap.scaled(label.size(), Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+                self.pixmap_cache.put((image_url, label.width()), scaled)
+                scaled_by_width[label.width()] = scaled
+            label.setPixmap(scaled_by_width[label.width()])
+
+        size = self.pending_row_thumbnails.pop(image_url, None)
+        if size is not None:
+            if size not in scaled_by_width:
+                self.pixmap_cache.put((image_url, size), pixmap.scaled(size, size, Qt.KeepAspectRatioByExpanding,
+                                                                       Qt.SmoothTransformation))
+            if self.results_ui_built:  # The history window can request thumbnails before any result
+                self.extra_songs_model.thumbnail_ready(image_url)
+            if self.history_model is not None:
+                self.history_model.thumbnail_ready(image_url)
+
+    def thumbnail_cache_stats(self):
+        stats = self.pixmap_cache.stats()
+        stats.update(self.thumbnail_loader.disk_cache.stats())
+        return stats
+
+    def on_thumbnail_failed(self, image_url, error_message):
+        print(f"Failed to load image: {error_message}")
+        self.pending_thumbnails.pop(image_url, None)
+        if self.pending_row_thumbnails.pop(image_url, None) is not None:
+            self.failed_thumbnails.add(image_url)  # Rows keep the placeholder instead of retrying on every repaint
 
     def toggle_extra_songs(self):
         if self.extra_songs_widget.isVisible():
@@ -707,6 +1053,34 @@ class ShazamCloneApp(QWidget):
             self.reveal_link.hide()  # Hide the reveal link when showing extra songs
 
     def clear_song_info(self):
+        # Stop and reset the media player
+        if self.media_player is not None:
+            self.media_player.stop()
+        self.is_paused = True  # Reset pause state
+        self.current_mp3_url = None  # Reset the mp3 URL
+        self.current_playing_row = None
+        self.playing_mp3_url = None
+
+        # Drop thumbnails still in flight for the old results
+        self.pending_thumbnails.clear()
+        self.pending_row_thumbnails.clear()
+        self.failed_thumbnails.clear()
+
+        if self.results_ui_built:
+            self.clear_results_ui()
+
+        # Show button container
+        self.button_container.show()
+
+        # Reset button text to initial state
+        self.button_text_label.setText("Nhấn để Msee")
+        self.record_button.show()
+        self.below_button_label.setText("Đang lắng nghe âm nhạc")
+        self.below_button_label.hide()
+        self.thinner_label.setText("Cố gắng giữ im lặng để Msee lắng nghe")
+        self.thinner_label.hide()
+
+    def clear_results_ui(self):
         # Hide clear button
         self.clear_button.hide()
 
@@ -719,31 +1093,8 @@ class ShazamCloneApp(QWidget):
         self.song_image_label.setPixmap(QPixmap(self.default_album_image).scaled(150, 150, Qt.KeepAspectRatio))
         self.song_image_label.hide()
 
-        # Stop and reset the media player
-        self.media_player.stop()
-        self.is_paused = True  # Reset pause state
-        self.current_mp3_url = None  # Reset the mp3 URL
-        self.current_playing_button = None
-
-        # Hide extra songs section if it's visible
-        while self.extra_songs_layout.count():
-            item = self.extra_songs_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-            else:
-                # If it's a layout, delete its children recursively
-                sub_layout = item.layout()
-                if sub_layout:
-                    while sub_layout.count():
-                        sub_item = sub_layout.takeAt(0)
-                        sub_widget = sub_item.widget()
-                        if sub_widget:
-                            sub_widget.deleteLater()
-                        else:
-                            # Recursively clear nested layouts
-                            self.clear_extra_songs(sub_layout)
-                    sub_layout.deleteLater()
+        # Drop the extra songs; the view paints nothing once the model is empty
+        self.extra_songs_model.clear()
 
         # Ensure the extra songs section is hidden
         self.extra_songs_widget.setVisible(False)
@@ -753,22 +1104,32 @@ class ShazamCloneApp(QWidget):
         self.scroll_area.hide()
         self.header_widget.hide()
 
-        # Show button container
-        self.button_container.show()
-
-        # Reset button text to initial state
-        self.button_text_label.setText("Nhấn để Msee")
-        self.record_button.show()
-        self.below_button_label.setText("Đang lắng nghe âm nhạc")
-        self.below_button_label.hide()
-        self.thinner_label.setText("Cố gắng giữ im lặng để Msee lắng nghe")
-        self.thinner_label.hide()
+    def closeEvent(self, event):
+        # Stop the workers so no thread outlives the window mid-recognition
+        self.cancel_recognition()
+        if self.ready:
+            self.streaming_thread.shutdown()
+            self.continuous_thread.shutdown()
+            self.processing_thread.shutdown()
+            self.audio_recorder_thread.wait()  # A capture gives up by itself if the stream stalls
+            self.audio_input.stop()
+            self.history_store.close()  # Writes whatever is still queued
+        super().closeEvent(event)
+
+    def show_timeout(self):
+        self.show_error("Hết thời gian chờ kết quả nhận diện")
 
     def show_error(self, error_message):
+        self.build_results_ui()
+
         # Show error message
         self.song_title_label.setText(error_message)
         self.album_artist_label.clear()
         self.release_year_label.clear()
+        self.genre_label.clear()
+        self.duration_label.clear()
+        self.scroll_area.show()
+        self.clear_button.show()
 
         # Reset button text to initial state
         self.button_text_label.setText("Nhấn để Msee")
@@ -783,7 +1144,16 @@ class ShazamCloneApp(QWidget):
 
 
 if __name__ == '__main__':
+    # MSEE_METRICS=prometheus:<file> or json:<file> turns on pipeline timing
+    metrics.configure_from_env()
+
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(metrics.export)
     window = ShazamCloneApp()
+    if "--continuous" in sys.argv:
+        # Unattended monitoring: start listening as soon as the app is ready and keep going
+        window.continuous_mode = True
+        if window.ready:
+            window.start_listening()
     window.show()
     sys.exit(app.exec_())
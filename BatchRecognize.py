@@ -0,0 +1,198 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from services.ResultWaiter import ResultWaiter
+from services.SongDataService import SongDataService
+
+CSV_FIELDS = ["path", "status", "title", "artistsNames", "link", "elapsed", "requests", "error"]
+DONE_STATUSES = {"ok", "not_found"}  # Errors and timeouts may be transient, so a rerun retries them
+
+
+class RateLimiter:
+    """Token bucket shared by all workers, limiting API requests per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedService:
+    """Wrap a ``SongDataService`` so every upload and result request takes a rate-limiter token."""
+
+    def __init__(self, service, limiter):
+        self.service = service
+        self.limiter = limiter
+
+    def send_audio(self, audio):
+        self.limiter.acquire()
+        return self.service.send_audio(audio)
+
+    def get_result(self, job_id, token, wait=None):
+        self.limiter.acquire()
+        return self.service.get_result(job_id, token, wait)
+
+    def stream_result_events(self, events_url, job_id, token, timeout):
+        self.limiter.acquire()
+        return self.service.stream_result_events(events_url, job_id, token, timeout)
+
+    def abort(self):
+        self.service.abort()
+
+
+def list_clips(source):
+    """Yield WAV paths from a directory tree, or from a manifest with one path per line."""
+    if os.path.isdir(source):
+        for root, _, names in os.walk(source):
+            for name in sorted(names):
+                if name.lower().endswith(".wav"):
+                    yield os.path.join(root, name)
+        return
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as manifest_file:
+        for line in manifest_file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield os.path.join(base_dir, line)
+
+
+def completed_paths(output_path):
+    """Paths an earlier, possibly interrupted, run recognised or found no match for.
+
+    Clips that failed or timed out are left out so they are retried; their new record is appended
+    after the old one, so the last record for a path is the one that counts.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "r", encoding="utf-8", newline="") as output_file:
+        if output_path.endswith(".csv"):
+            return {row["path"] for row in csv.DictReader(output_file) if row.get("status") in DONE_STATUSES}
+        done = set()
+        for line in output_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by the interruption; that clip is retried
+            if record.get("status") in DONE_STATUSES and "path" in record:
+                done.add(record["path"])
+        return done
+
+
+def recognize_clip(service, waiter_options, path, stop=None):
+    started = time.perf_counter()
+    record = {"path": path}
+    waiter = ResultWaiter(service, **waiter_options)
+    try:
+        with open(path, "rb") as clip_file:
+            response_data = service.send_audio(clip_file.read())
+        if "error" in response_data:
+            result_data = response_data
+        else:
+            result_data = waiter.wait(response_data.get("job_id"), response_data.get("token"), hints=response_data,
+                                      cancelled=stop)
+    except Exception as e:
+        result_data = {"error": str(e)}
+
+    if result_data is None:
+        record["status"] = "timeout"
+    elif "error" in result_data:
+        record.update(status="error", error=result_data["error"])
+    elif result_data.get("list_result"):
+        top = result_data["list_result"][0]
+        record.update(status="ok", title=top.get("title", ""), artistsNames=top.get("artistsNames", ""),
+                      link=top.get("link", ""), list_result=result_data["list_result"])
+    else:
+        record["status"] = "not_found"
+
+    record["elapsed"] = round(time.perf_counter() - started, 3)
+    record["requests"] = 1 + waiter.poll_count
+    return record
+
+
+def run(source, output_path, concurrency=8, rate=10.0, timeout=30, api_url=None):
+    done = completed_paths(output_path)
+    clips = [path for path in list_clips(source) if path not in done]
+    print(f"{len(clips)} clips to recognize ({len(done)} already done)")
+
+    service_options = {"api_url": api_url} if api_url else {}
+    service = RateLimitedService(SongDataService(pool_size=concurrency, **service_options), RateLimiter(rate))
+    waiter_options = {"mode": "auto", "timeout": timeout}
+    is_csv = output_path.endswith(".csv")
+    write_header = is_csv and not os.path.exists(output_path)
+
+    started = time.perf_counter()
+    counts = {}
+    finished = 0
+    stop = threading.Event()  # Ends result waits early on Ctrl-C
+    with open(output_path, "a", encoding="utf-8", newline="") as output_file, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        writer = csv.DictWriter(output_file, CSV_FIELDS, extrasaction="ignore") if is_csv else None
+        if write_header:
+            writer.writeheader()
+
+        # Only a couple of clips per worker are queued at a time, so an interrupted run leaves the
+        # rest unsent instead of working through the whole queue on the way out
+        remaining = iter(clips)
+        pending = set()
+        try:
+            while True:
+                while len(pending) < 2 * concurrency:
+                    path = next(remaining, None)
+                    if path is None:
+                        break
+                    pending.add(executor.submit(recognize_clip, service, waiter_options, path, stop))
+                if not pending:
+                    break
+                done_futures, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    record = future.result()
+                    if writer is not None:
+                        writer.writerow(record)
+                    else:
+                        output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output_file.flush()  # Each finished clip is durable, so an interrupted run resumes after it
+
+                    finished += 1
+                    counts[record["status"]] = counts.get(record["status"], 0) + 1
+                    if finished % 50 == 0 or finished == len(clips):
+                        elapsed = time.perf_counter() - started
+                        print(f"{finished}/{len(clips)} done, {finished / elapsed * 3600:.0f} clips/hour, {counts}")
+        except KeyboardInterrupt:
+            # Drop queued clips and fail the requests in flight; none of them is recorded, so a rerun resumes here
+            for future in pending:
+                future.cancel()
+            stop.set()
+            service.abort()
+            print(f"Interrupted after {finished}/{len(clips)} clips; run again to resume")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recognize a batch of recorded WAV clips without the GUI.")
+    parser.add_argument("source", help="Directory of WAV files, or a manifest listing one path per line")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="Results file, .jsonl or .csv")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Clips in flight at once")
+    parser.add_argument("--rate", type=float, default=10.0, help="Maximum API requests per second")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds to wait for each result")
+    parser.add_argument("--api-url", default=None, help="Recognition API base URL (default: production)")
+    args = parser.parse_args()
+
+    run(args.source, args.output, args.concurrency, args.rate, args.timeout, args.api_url)
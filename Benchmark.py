@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtWidgets import QApplication
+
+from App import ShazamCloneApp
+from StubServer import StubRecognitionServer
+from services.AudioInput import AudioInput
+from services.HistoryStore import HistoryStore
+from services.Metrics import percentiles
+from services.SongDataService import SongDataService
+from services.ThumbnailCache import DiskCache
+
+STAGES = ["capture", "upload", "wait", "render", "thumbnails", "total"]
+MODES = ["streaming", "oneshot"]  # The app's default first
+
+
+def load_clip(path):
+    with wave.open(path, "rb") as wav_file:
+        samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype="<i2")
+        return samples.reshape(-1, wav_file.getnchannels())[:, :1].copy()
+
+
+def replay(clip, realtime=True):
+    """Audio source for ``AudioRecorderThread`` that plays back ``clip`` instead of the microphone."""
+    def source(frames, sample_rate):
+        if realtime:
+            time.sleep(frames / sample_rate)
+        return np.resize(clip, (frames, 1))
+    return source
+
+
+class ReplayInput(AudioInput):
+    """``AudioInput`` that loops ``clip`` into the ring buffer in real time instead of opening a device."""
+
+    def __init__(self, clip, **kwargs):
+        super().__init__(**kwargs)
+        self.clip = clip
+        self.thread = None
+        self.running = threading.Event()
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.running.set()
+            self.thread = threading.Thread(target=self.play, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running.clear()
+            self.thread = None
+
+    def play(self):
+        block = int(self.block_duration * self.sample_rate)
+        position = 0
+        next_block = time.monotonic()
+        while self.running.is_set():
+            indices = (position + np.arange(block)) % len(self.clip)
+            self.on_block(self.clip[indices], block, None, None)
+            position += block
+            next_block += self.block_duration
+            time.sleep(max(next_block - time.monotonic(), 0))
+
+
+class TimedService(SongDataService):
+    """``SongDataService`` that records when each upload of the current run starts and ends."""
+
+    def __init__(self, marks, **kwargs):
+        super().__init__(**kwargs)
+        self.marks = marks
+
+    def send_recording(self, audio_data, sample_rate):
+        started = time.perf_counter()
+        response_data = super().send_recording(audio_data, sample_rate)
+        # Streaming makes several uploads per press
+        self.marks.setdefault("uploads", []).append((started, time.perf_counter()))
+        self.marks["bytes_sent"] = len(self.last_encoded.data) if self.last_encoded else 0
+        return response_data
+
+
+def run_benchmark(iterations, clip, realtime_capture=True, stub_options=None, run_timeout=60, mode="streaming"):
+    """Time ``iterations`` presses of the record button in ``mode`` (``'streaming'`` or ``'oneshot'``).
+
+    Streaming always captures in real time, since its prefixes are read while audio arrives.
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    stub = StubRecognitionServer(**(stub_options or {})).start()
+
+    marks = {}
+    window = ShazamCloneApp(lazy_startup=False)  # Services must exist before they are swapped below
+    window.streaming_mode = mode == "streaming"
+    window.fingerprint_cache = None  # Every run must go over the wire
+    window.local_service = None
+    window.song_data_service = TimedService(marks, api_url=stub.api_url)
+    # The persistent workers keep the services they were built with, so re-point them as well
+    worker = window.streaming_thread if window.streaming_mode else window.processing_thread
+    worker.service = window.song_data_service
+    worker.fingerprint_cache = None
+    worker.fallback_service = None
+    worker.gate = None  # The default synthetic clip is noise and would be rejected
+    window.thumbnail_loader.disk_cache = DiskCache(tempfile.mkdtemp(prefix="msee-bench-"))
+    window.history_store.close()  # Keep benchmark runs out of the user's recognition history
+    window.history_store = HistoryStore(os.path.join(tempfile.mkdtemp(prefix="msee-bench-"), "history.sqlite3"))
+    window.audio_recorder_thread.audio_source = replay(clip, realtime_capture)
+    window.audio_recorder_thread.gate = None
+    window.streaming_thread.audio_input = ReplayInput(clip, sample_rate=window.streaming_thread.sample_rate)
+
+    loop = QEventLoop()
+
+    def wait_for_thumbnails():
+        if window.pending_thumbnails:
+            QTimer.singleShot(5, wait_for_thumbnails)
+        else:
+            marks["thumbnails"] = time.perf_counter()
+            loop.quit()
+
+    handle_response = window.handle_response
+
+    def timed_handle_response(response_data, *args, **kwargs):
+        marks["result"] = time.perf_counter()
+        handle_response(response_data, *args, **kwargs)
+        marks["rendered"] = time.perf_counter()
+        wait_for_thumbnails()
+
+    def failed(error_message):
+        marks["error"] = error_message
+        loop.quit()
+
+    window.handle_response = timed_handle_response
+    # Hook the worker signals themselves: the app connected its own bound methods to them at startup
+    window.audio_recorder_thread.recording_done.connect(lambda *args: marks.setdefault("captured", time.perf_counter()))
+    window.streaming_thread.recording_done.connect(lambda *args: marks.setdefault("captured", time.perf_counter()))
+    window.audio_recorder_thread.error_occurred.connect(failed)
+    window.audio_recorder_thread.clip_rejected.connect(lambda reason: failed(f"clip rejected: {reason}"))
+    for recognition_worker in (window.streaming_thread, window.processing_thread):
+        recognition_worker.error_occurred.connect(lambda job_id, error_message: failed(error_message))
+        recognition_worker.timed_out.connect(lambda job_id: failed("no result before the deadline"))
+
+    samples = {stage: [] for stage in STAGES}
+    polls = []
+    uploads = []
+    errors = 0
+    for _ in range(iterations):
+        marks.clear()
+        marks["start"] = time.perf_counter()
+        guard = QTimer()
+        guard.setSingleShot(True)
+        guard.timeout.connect(lambda: failed("benchmark run timed out"))
+        guard.start(int(run_timeout * 1000))
+        window.start_listening()
+        loop.exec_()
+        guard.stop()
+
+        if "error" in marks or "thumbnails" not in marks:
+            errors += 1
+            print(f"Run failed: {marks.get('error')}")
+            window.cancel_recognition()
+            continue
+
+        # The upload whose answer was shown is the last one to end before the result
+        upload_start, upload_end = max((upload for upload in marks["uploads"] if upload[1] <= marks["result"]),
+                                       key=lambda upload: upload[1])
+        if "captured" in marks:  # A streaming press stopped early never captures the full clip
+            samples["capture"].append(marks["captured"] - marks["start"])
+        samples["upload"].append(upload_end - upload_start)
+        samples["wait"].append(marks["result"] - upload_end)
+        samples["render"].append(marks["rendered"] - marks["result"])
+        samples["thumbnails"].append(marks["thumbnails"] - marks["rendered"])
+        samples["total"].append(marks["rendered"] - marks["start"])
+        polls.append(worker.poll_count)
+        uploads.append(len(marks["uploads"]))
+        window.clear_song_info()
+        app.processEvents()
+
+    window.close()  # Shuts down the recognition workers
+    stub.stop()
+    report = {stage: percentiles(values) for stage, values in samples.items()}
+    report["polls"] = percentiles(polls)
+    report["uploads"] = percentiles(uploads)
+    report["errors"] = errors
+    return report
+
+
+def print_report(report):
+    print(f"{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        stats = report[stage]
+        if stats["count"]:
+            print(f"{stage:<12}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}")
+    if report["polls"]["count"]:
+        print(f"polls per recognition: p50 {report['polls']['p50']:.0f}, p95 {report['polls']['p95']:.0f}")
+        print(f"uploads per recognition: p50 {report['uploads']['p50']:.0f}, p95 {report['uploads']['p95']:.0f}")
+    print(f"errors: {report['errors']}")
+
+
+def compare(report, baseline, tolerance):
+    """Return the stages whose p95 regressed more than ``tolerance`` (a fraction) over the baseline."""
+    regressions = []
+    for stage in STAGES:
+        current, previous = report[stage].get("p95"), baseline.get(stage, {}).get("p95")
+        if current is not None and previous and current > previous * (1 + tolerance):
+            regressions.append(f"{stage}: p95 {previous * 1000:.1f} ms -> {current * 1000:.1f} ms")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="End-to-end recognition latency benchmark against a local stub API.")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument("--clip", help="WAV clip replayed as the microphone input (default: synthetic noise)")
+    parser.add_argument("--mode", choices=MODES + ["both"], default="both",
+                        help="Recognition path to time: streaming (the app's default), oneshot, or both")
+    parser.add_argument("--no-realtime-capture", action="store_true",
+                        help="Skip waiting out the capture duration (one-shot mode only)")
+    parser.add_argument("--server-delay", type=float, default=1.0, help="Stub seconds until results are ready")
+    parser.add_argument("--server-jitter", type=float, default=0.2, help="Stub random extra delay in seconds")
+    parser.add_argument("--results", type=int, default=5, help="Stub entries in list_result")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Stub padding in the result payload")
+    parser.add_argument("--server-score", type=int, default=None,
+                        help="Stub match score for the top result (default: none; streaming then needs two "
+                             "prefixes to agree before it stops early)")
+    parser.add_argument("--save-baseline", help="Write the reports, by mode, to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a saved baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 regression as a fraction")
+    args = parser.parse_args()
+
+    clip = load_clip(args.clip) if args.clip else \
+        (np.random.default_rng(0).normal(0, 3000, (22050, 1))).astype(np.int16)
+    stub_options = {"delay": args.server_delay, "jitter": args.server_jitter, "result_count": args.results,
+                    "payload_bytes": args.payload_bytes, "score": args.server_score}
+    reports = {}
+    for mode in (MODES if args.mode == "both" else [args.mode]):
+        reports[mode] = run_benchmark(args.iterations, clip, not args.no_realtime_capture, stub_options, mode=mode)
+        print(f"{mode}:")
+        print_report(reports[mode])
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(reports, baseline_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = [f"{mode} {regression}" for mode, report in reports.items()
+                       for regression in compare(report, baseline.get(mode, {}), args.tolerance)]
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
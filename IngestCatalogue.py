@@ -0,0 +1,185 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import wave
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from services.Fingerprinter import landmark_hashes
+from services.LandmarkIndex import write_shard
+from services.LocalRecognitionService import DEFAULT_INDEX_DIR
+
+try:
+    import soundfile as sf
+except ImportError:  # Without libsndfile only 16-bit PCM WAV files can be ingested
+    sf = None
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".ogg", ".mp3"} if sf is not None else {".wav"}
+MANIFEST = "manifest.json"
+
+
+def decode(path):
+    """Return ``(mono samples, sample rate)`` for an audio file."""
+    if sf is not None:
+        data, sample_rate = sf.read(path, dtype="float32", always_2d=True)
+        return data.mean(axis=1), sample_rate
+
+    with wave.open(path, "rb") as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise ValueError("only 16-bit PCM WAV is supported without soundfile")
+        samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype="<i2")
+        samples = samples.reshape(-1, wav_file.getnchannels()).mean(axis=1)
+        return samples, wav_file.getframerate()
+
+
+def read_metadata(path, duration):
+    """Build ``SongMetadata`` fields from a ``<file>.json`` sidecar, or from an "Artist - Title" file name."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    artist, _, title = stem.rpartition(" - ")
+    metadata = {
+        "title": title or stem,
+        "artistsNames": artist or "Unknown",
+        "category": "Unknown",
+        "duration": int(duration),
+        "link": "",
+        "releaseDate": 0,
+        "thumbnailM": "",
+        "mp3url": "",
+    }
+    sidecar = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(sidecar):
+        with open(sidecar, "r", encoding="utf-8") as sidecar_file:
+            metadata.update(json.load(sidecar_file))
+    return metadata
+
+
+def fingerprint_file(path, cache_path):
+    """Worker: decode and fingerprint one file, saving the landmarks to ``cache_path``."""
+    samples, sample_rate = decode(path)
+    hashes, times = landmark_hashes(samples, sample_rate)
+    np.savez(cache_path, hashes=hashes, times=times)
+    return read_metadata(path, len(samples) / sample_rate)
+
+
+def scan(source_dir):
+    for root, _, names in os.walk(source_dir):
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, source_dir).replace(os.sep, "/"), path
+
+
+def ingest(source_dir, db_dir, workers=None, num_shards=16):
+    started = time.perf_counter()
+    cache_dir = os.path.join(db_dir, "fingerprints")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    manifest_path = os.path.join(db_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    resharded = manifest.get("num_shards", num_shards) != num_shards
+    if resharded:
+        manifest = {}  # Re-sharding invalidates every shard
+    files = manifest.get("files", {})
+
+    # Files land in a shard by path, so only shards with added, changed or removed files are rebuilt
+    current = {}
+    pending = []
+    dirty_shards = set(range(num_shards)) if resharded else set()
+    for relative_path, path in scan(source_dir):
+        stat = os.stat(path)
+        key = hashlib.sha1(relative_path.encode("utf-8")).hexdigest()
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime, "key": key,
+                 "shard": zlib.crc32(relative_path.encode("utf-8")) % num_shards}
+        previous = files.get(relative_path)
+        if previous and previous["size"] == entry["size"] and previous["mtime"] == entry["mtime"]:
+            current[relative_path] = previous
+            continue
+        current[relative_path] = entry
+        pending.append((relative_path, path))
+        dirty_shards.add(entry["shard"])
+
+    for relative_path, entry in files.items():
+        if relative_path not in current:
+            dirty_shards.add(entry["shard"])
+            try:
+                os.remove(os.path.join(cache_dir, entry["key"] + ".npz"))
+            except OSError:
+                pass
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fingerprint_file, path, os.path.join(cache_dir, current[relative_path]["key"])):
+                   relative_path for relative_path, path in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            relative_path = futures[future]
+            try:
+                current[relative_path]["metadata"] = future.result()
+            except Exception as e:
+                print(f"Failed to ingest {relative_path}: {e}")
+                del current[relative_path]
+                failed += 1
+            if done % 100 == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{len(pending)} files fingerprinted ({done / elapsed:.1f} files/s)")
+
+    for shard in sorted(dirty_shards):
+        build_shard(db_dir, cache_dir, shard, [entry for entry in current.values() if entry["shard"] == shard])
+    remove_stale_shards(db_dir, num_shards)
+
+    with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+        json.dump({"num_shards": num_shards, "files": current}, manifest_file, ensure_ascii=False)
+
+    elapsed = time.perf_counter() - started
+    ingested = len(pending) - failed
+    print(f"Ingested {ingested} files ({failed} failed, {len(current) - ingested} unchanged) into "
+          f"{len(dirty_shards)} shards in {elapsed:.1f} s ({ingested / elapsed if elapsed else 0:.1f} files/s)")
+
+
+def remove_stale_shards(db_dir, num_shards):
+    """Delete shard directories left over from a run with more shards; LandmarkIndex loads every one it finds."""
+    for entry in os.scandir(db_dir):
+        name = entry.name[:-len(".tmp")] if entry.name.endswith(".tmp") else entry.name
+        if entry.is_dir() and name.startswith("shard-") and name[len("shard-"):].isdigit() \
+                and int(name[len("shard-"):]) >= num_shards:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def build_shard(db_dir, cache_dir, shard, entries):
+    shard_dir = os.path.join(db_dir, f"shard-{shard:03d}")
+    if not entries:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        return
+
+    tracks, hashes, track_ids, times = [], [], [], []
+    for track_id, entry in enumerate(entries):
+        with np.load(os.path.join(cache_dir, entry["key"] + ".npz")) as landmarks:
+            hashes.append(landmarks["hashes"])
+            times.append(landmarks["times"])
+        track_ids.append(np.full(len(hashes[-1]), track_id, dtype=np.int32))
+        tracks.append(entry["metadata"])
+
+    # Build beside the live shard and swap it in, so a running app never sees a half-written one
+    staging_dir = shard_dir + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    write_shard(staging_dir, tracks, np.concatenate(hashes), np.concatenate(track_ids), np.concatenate(times))
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.replace(staging_dir, shard_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fingerprint a folder of audio into a local Msee catalogue.")
+    parser.add_argument("source", help="Directory tree of audio files to ingest")
+    parser.add_argument("--db", default=DEFAULT_INDEX_DIR, help=f"Catalogue directory (default: {DEFAULT_INDEX_DIR})")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--shards", type=int, default=16, help="Number of index shards")
+    args = parser.parse_args()
+
+    ingest(args.source, args.db, args.workers, args.shards)
@@ -0,0 +1,123 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from StubServer import StubRecognitionServer
+from services.AudioEncoder import encode_wav
+from services.Metrics import percentiles
+from services.ResultWaiter import ResultWaiter
+from services.SongDataService import SongDataService
+
+# ResultWaiter settings for each polling strategy under test
+STRATEGIES = {
+    "fixed": {"mode": "poll", "first_interval": 0.5, "backoff": 1.0},  # The original 0.5 s loop
+    "backoff": {"mode": "poll"},
+    "long_poll": {"mode": "long_poll"},
+}
+
+
+class VirtualClient(threading.Thread):
+    """One simulated kiosk: upload a clip, wait for its result, repeat until ``stop_at``."""
+
+    def __init__(self, api_url, payload, waiter_options, stop_at, think_time):
+        super().__init__(daemon=True)
+        # Each client owns its service, like a separate app instance would
+        self.service = SongDataService(api_url=api_url, pool_size=1, max_retries=0)
+        self.waiter = ResultWaiter(self.service, **waiter_options)
+        self.payload = payload
+        self.stop_at = stop_at
+        self.think_time = think_time
+        self.latencies = []
+        self.requests = 0
+        self.errors = 0
+
+    def run(self):
+        while time.monotonic() < self.stop_at:
+            started = time.perf_counter()
+            response_data = self.service.send_audio(self.payload)
+            self.requests += 1
+            if "error" in response_data:
+                self.errors += 1
+                continue
+
+            result_data = self.waiter.wait(response_data.get("job_id"), response_data.get("token"),
+                                           hints=response_data)
+            self.requests += self.waiter.poll_count
+            if result_data is None or "error" in result_data:
+                self.errors += 1
+            else:
+                self.latencies.append(time.perf_counter() - started)
+            time.sleep(self.think_time)
+
+
+def run_level(api_url, payload, strategy, clients, duration, think_time):
+    stop_at = time.monotonic() + duration
+    workers = [VirtualClient(api_url, payload, STRATEGIES[strategy], stop_at, think_time) for _ in range(clients)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for worker in workers for latency in worker.latencies]
+    requests = sum(worker.requests for worker in workers)
+    errors = sum(worker.errors for worker in workers)
+    attempts = len(latencies) + errors
+    return {
+        "strategy": strategy,
+        "clients": clients,
+        "recognitions": len(latencies),
+        "requests_per_second": requests / elapsed,
+        "poll_amplification": requests / attempts if attempts else 0.0,  # HTTP requests per recognition
+        "latency": percentiles(latencies),
+        "error_rate": errors / attempts if attempts else 0.0,
+    }
+
+
+def print_table(rows):
+    print(f"{'strategy':<10}{'clients':>8}{'recog':>7}{'req/s':>9}{'req/recog':>10}"
+          f"{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'errors':>8}")
+    for row in rows:
+        latency = row["latency"]
+        p50, p95, p99 = (f"{latency[key]:.2f}" if latency[key] is not None else "-" for key in ("p50", "p95", "p99"))
+        print(f"{row['strategy']:<10}{row['clients']:>8}{row['recognitions']:>7}{row['requests_per_second']:>9.1f}"
+              f"{row['poll_amplification']:>10.1f}{p50:>8}{p95:>8}{p99:>8}{row['error_rate']:>8.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load-test the upload/result protocol with many virtual clients.")
+    parser.add_argument("--clients", default="10,50,100", help="Comma-separated concurrency levels")
+    parser.add_argument("--strategies", default="fixed,backoff,long_poll",
+                        help=f"Comma-separated polling strategies: {', '.join(STRATEGIES)}")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per level")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pause between a client's recognitions")
+    parser.add_argument("--clip-seconds", type=float, default=5, help="Length of the uploaded clip")
+    parser.add_argument("--server-delay", type=float, default=1.5, help="Stub seconds until results are ready")
+    parser.add_argument("--server-jitter", type=float, default=0.5, help="Stub random extra delay in seconds")
+    parser.add_argument("--api-url", help="Target an already running server instead of an in-process stub")
+    args = parser.parse_args()
+
+    rate = 22050
+    clip = np.random.default_rng(0).normal(0, 3000, int(args.clip_seconds * rate)).astype(np.int16)
+    payload = encode_wav(clip, rate)
+
+    rows = []
+    for strategy in args.strategies.split(","):
+        stub = None
+        api_url = args.api_url
+        if api_url is None:
+            # Fresh stub per strategy; long-poll is only advertised when that strategy is under test
+            stub = StubRecognitionServer(delay=args.server_delay, jitter=args.server_jitter,
+                                         long_poll=strategy == "long_poll").start()
+            api_url = stub.api_url
+        for clients in (int(level) for level in args.clients.split(",")):
+            rows.append(run_level(api_url, payload, strategy, clients, args.duration, args.think_time))
+            print_table(rows[-1:])
+        if stub is not None:
+            stub.stop()
+
+    print()
+    print_table(rows)
@@ -0,0 +1,57 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Startup-optimised build: a one-dir bundle launches straight from disk instead of unpacking a
+# one-file archive to a temp dir on every start, and is not UPX-compressed so nothing has to be
+# decompressed either. Modules the app never imports are left out to keep the bundle small.
+# Build with: pyinstaller Msee-onedir.spec  ->  dist/Msee-onedir/Msee
+
+
+a = Analysis(
+    ['App.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('assets/default_album.jpg', 'assets'), ('assets/music_note_icon.png', 'assets')],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[
+        'tkinter', 'unittest', 'pydoc', 'doctest', 'pdb', 'lib2to3', 'xmlrpc',
+        'pydub', 'pyaudio',  # Not used by the app
+        'PyQt5.QtBluetooth', 'PyQt5.QtDesigner', 'PyQt5.QtHelp', 'PyQt5.QtLocation', 'PyQt5.QtNfc',
+        'PyQt5.QtOpenGL', 'PyQt5.QtPositioning', 'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtQuickWidgets',
+        'PyQt5.QtRemoteObjects', 'PyQt5.QtSensors', 'PyQt5.QtSerialPort', 'PyQt5.QtSql', 'PyQt5.QtTest',
+        'PyQt5.QtWebChannel', 'PyQt5.QtWebEngine', 'PyQt5.QtWebEngineCore', 'PyQt5.QtWebEngineWidgets',
+        'PyQt5.QtWebSockets', 'PyQt5.QtXmlPatterns',
+        'numpy.distutils', 'numpy.f2py', 'numpy.testing',
+    ],
+    noarchive=False,
+    optimize=1,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='Msee',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='Msee-onedir',
+)
@@ -1,79 +1,244 @@
-import pyaudio
-import wave
+import argparse
+import json
 import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from pydub import AudioSegment
-import random
 
-# Parameters
-CHANNELS = 1
-RATE = 22050
-CHUNK = 1024
-RECORD_SECONDS = 15
-SEGMENT_DURATION = 5000  # Duration of each segment in milliseconds
-NUM_SEGMENTS = 5
-WAVE_OUTPUT_DIR = "recordings\\with noises"
-
-# Create output directory if it doesn't exist
-if not os.path.exists(WAVE_OUTPUT_DIR):
-    os.makedirs(WAVE_OUTPUT_DIR)
-
-
-def get_filename(prefix="recording"):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"{prefix}_{timestamp}.wav"
-
-
-# Initialize PyAudio
-audio = pyaudio.PyAudio()
-
-# Start recording
-print("Recording...")
-stream = audio.open(format=pyaudio.paInt16, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK)
-
-frames = []
-
-for _ in range(0, int(RATE / CHUNK * RECORD_SECONDS)):
-    data = stream.read(CHUNK)
-    frames.append(data)
-
-print("Finished recording.")
-
-# Stop recording
-stream.stop_stream()
-stream.close()
-audio.terminate()
-
-# Save the recording
-recording_filename = get_filename()
-file_path = os.path.join(WAVE_OUTPUT_DIR, recording_filename)
-with wave.open(file_path, 'wb') as wf:
-    wf.setnchannels(CHANNELS)
-    wf.setsampwidth(audio.get_sample_size(pyaudio.paInt16))
-    wf.setframerate(RATE)
-    wf.writeframes(b''.join(frames))
-
-print(f"Recording saved to {file_path}")
-
-# Load the recording with pydub
-audio_segment = AudioSegment.from_wav(file_path)
-total_duration = len(audio_segment)  # Duration in milliseconds
-
-# Extract recording information for segment naming
-recording_info = f"{os.path.splitext(recording_filename)[0]}"
-
-# Generate random start times for segments
-segment_start_times = sorted(random.sample(range(0, total_duration - SEGMENT_DURATION), NUM_SEGMENTS))
-
-for i, start_time in enumerate(segment_start_times):
-    start_time_ms = start_time
-    end_time_ms = start_time_ms + SEGMENT_DURATION
-    segment = audio_segment[start_time_ms:end_time_ms]
-    segment_filename = os.path.join(
-        WAVE_OUTPUT_DIR,
-        f"{recording_info}_segment_{i + 1}_{start_time_ms // 1000}s.wav"
-    )
-    segment.export(segment_filename, format="wav")
-    print(f"Segment saved to {segment_filename}")
-
-print("All segments have been saved.")
+import numpy as np
+
+from services.AudioEncoder import encode_wav, resample
+
+NOISE_PROFILES = ["none", "white", "pink", "brown", "hum"]  # Plus one per file in --noise-dir
+SNR_LEVELS = [20, 10, 5, 0]  # Signal-to-noise ratios in dB for noisy clips
+BATCH_SIZE = 64  # Clips per worker task, so process-pool overhead stays small
+CLIPS_PER_DIR = 1000
+
+sources_cache = {}  # Per-process memory maps, opened on first use
+
+
+def wav_layout(path):
+    """Return ``(data offset, frames, channels, sample rate)`` of a 16-bit PCM WAV file."""
+    with open(path, "rb") as wav_file:
+        riff, _, wave_id = struct.unpack("<4sI4s", wav_file.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+        fmt = None
+        while True:
+            header = wav_file.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", wav_file.read(16))
+                wav_file.seek(size - 16 + size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path} has no fmt chunk before its data")
+                audio_format, channels, sample_rate, _, _, bits = fmt
+                if audio_format not in (1, 0xFFFE) or bits != 16:
+                    raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+                return wav_file.tell(), size // (2 * channels), channels, sample_rate
+            else:
+                wav_file.seek(size + size % 2, os.SEEK_CUR)  # Chunks are padded to an even size
+
+
+def open_source(path):
+    """Memory-map a WAV file as ``(frames x channels int16 array, sample rate)``; pages load only when sliced."""
+    if path not in sources_cache:
+        offset, frames, channels, sample_rate = wav_layout(path)
+        samples = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(frames, channels))
+        sources_cache[path] = samples, sample_rate
+    return sources_cache[path]
+
+
+def list_wavs(directory):
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if name.lower().endswith(".wav"):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def to_mono(frames):
+    """Float32 mono in [-1, 1] from an int16 frames x channels slice."""
+    mono = frames[:, 0].astype(np.float32) if frames.shape[1] == 1 else frames.mean(axis=1, dtype=np.float32)
+    return mono / 32768
+
+
+def read_segment(path, start_seconds, duration, sample_rate):
+    """Mono float32 slice of a source in [-1, 1], resampled to ``sample_rate``."""
+    samples, source_rate = open_source(path)
+    start = int(start_seconds * source_rate)
+    segment = to_mono(samples[start:start + int(duration * source_rate)])
+    return resample(segment, source_rate, sample_rate)
+
+
+def synthetic_noise(profile, length, sample_rate, rng):
+    if profile == "white":
+        return rng.standard_normal(length).astype(np.float32)
+    if profile in ("pink", "brown"):
+        # Shape white noise in the frequency domain: 1/f power for pink, 1/f^2 for brown
+        spectrum = np.fft.rfft(rng.standard_normal(length))
+        frequencies = np.maximum(np.fft.rfftfreq(length, 1 / sample_rate), 20.0)
+        spectrum /= np.sqrt(frequencies) if profile == "pink" else frequencies
+        return np.fft.irfft(spectrum, length).astype(np.float32)
+    if profile == "hum":
+        # Mains hum with harmonics and a little hiss
+        t = np.arange(length) / sample_rate
+        base = rng.choice([50.0, 60.0])
+        hum = sum(np.sin(2 * np.pi * base * k * t + rng.uniform(0, 2 * np.pi)) / k for k in range(1, 6))
+        return (hum + 0.05 * rng.standard_normal(length)).astype(np.float32)
+    raise ValueError(f"unknown noise profile {profile!r}")
+
+
+def noise_segment(profile, noise_files, length, sample_rate, rng):
+    if profile in noise_files:
+        path = noise_files[profile]
+        samples, source_rate = open_source(path)
+        frames = int(length * source_rate / sample_rate) + 1
+        start = int(rng.integers(0, max(len(samples) - frames, 0) + 1))
+        segment = resample(to_mono(samples[start:start + frames]), source_rate, sample_rate)
+        return np.resize(segment, length)  # Short noise files loop
+    return synthetic_noise(profile, length, sample_rate, rng)
+
+
+def mix(clean, noise, snr_db):
+    """Add noise scaled to ``snr_db`` below the clip's RMS, keeping the sum within full scale."""
+    clean_rms = np.sqrt(np.mean(np.square(clean)))
+    noise_rms = np.sqrt(np.mean(np.square(noise)))
+    if clean_rms > 0 and noise_rms > 0:
+        clean = clean + noise * (clean_rms / noise_rms / 10 ** (snr_db / 20))
+    peak = np.max(np.abs(clean))
+    return clean / peak * 0.99 if peak > 0.99 else clean
+
+
+def plan_clip(index, config, durations):
+    """Pick a clip's source, offset, noise and SNR from ``(seed, index)`` alone, so output is reproducible."""
+    rng = np.random.default_rng([config["seed"], index])
+    source = int(rng.integers(len(durations)))
+    start = float(rng.uniform(0, durations[source] - config["duration"]))
+    noise = str(rng.choice(config["noises"]))
+    snr = None if noise == "none" else float(rng.choice(config["snrs"]))
+    return rng, {"source": config["sources"][source], "start": round(start, 3), "noise": noise, "snr_db": snr}
+
+
+def clip_path(index):
+    return os.path.join(f"{index // CLIPS_PER_DIR:03d}", f"clip_{index:06d}.wav")
+
+
+def generate_batch(first, last, config, durations):
+    """Worker: write clips ``first`` to ``last - 1`` and return their manifest records."""
+    records = []
+    sample_rate = config["sample_rate"]
+    length = int(config["duration"] * sample_rate)
+    for index in range(first, last):
+        rng, record = plan_clip(index, config, durations)
+        audio = np.resize(read_segment(record["source"], record["start"], config["duration"], sample_rate), length)
+        if record["noise"] != "none":
+            noise = noise_segment(record["noise"], config["noise_files"], length, sample_rate, rng)
+            audio = mix(audio, noise, record["snr_db"])
+
+        relative_path = clip_path(index)
+        path = os.path.join(config["output_dir"], relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as clip_file:
+            clip_file.write(encode_wav(audio.astype(np.float32), sample_rate))
+        records.append(dict(record, path=relative_path.replace(os.sep, "/"), duration=config["duration"],
+                            source=os.path.relpath(record["source"], config["source_dir"]).replace(os.sep, "/")))
+    return records
+
+
+def generate(source_dir, output_dir, count, duration=5.0, seed=0, noises=None, snrs=None, noise_dir=None,
+             sample_rate=22050, workers=None):
+    started = time.perf_counter()
+    noise_files = {os.path.splitext(os.path.basename(path))[0]: path for path in list_wavs(noise_dir)} \
+        if noise_dir else {}
+    config = {
+        "source_dir": source_dir,
+        "output_dir": output_dir,
+        "sources": [],
+        "duration": duration,
+        "seed": seed,
+        "noises": list(noises or NOISE_PROFILES + sorted(noise_files)),
+        "snrs": list(snrs or SNR_LEVELS),
+        "noise_files": noise_files,
+        "sample_rate": sample_rate,
+    }
+    durations = []
+    for path in list_wavs(source_dir):
+        try:
+            _, frames, _, source_rate = wav_layout(path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        if frames / source_rate >= duration:
+            config["sources"].append(path)
+            durations.append(frames / source_rate)
+    if not durations:
+        raise SystemExit(f"No 16-bit WAV sources of at least {duration} s in {source_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    batches = [(first, min(first + BATCH_SIZE, count)) for first in range(0, count, BATCH_SIZE)]
+    done = 0
+    # Results come back in batch order, so the manifest is identical from run to run
+    with open(os.path.join(output_dir, "manifest.jsonl"), "w", encoding="utf-8") as manifest_file, \
+            open(os.path.join(output_dir, "clips.txt"), "w", encoding="utf-8") as clips_file, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        for records in executor.map(generate_batch, [first for first, _ in batches], [last for _, last in batches],
+                                    [config] * len(batches), [durations] * len(batches)):
+            for record in records:
+                manifest_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                clips_file.write(record["path"] + "\n")  # Plain path list for BatchRecognize.py
+            done += len(records)
+            if done % (BATCH_SIZE * 16) == 0 or done == count:
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{count} clips written ({done / elapsed:.1f} clips/s)")
+
+    elapsed = time.perf_counter() - started
+    print(f"Generated {count} clips of {duration} s from {len(durations)} sources into {output_dir} "
+          f"in {elapsed:.1f} s ({count / elapsed if elapsed else 0:.1f} clips/s)")
+
+
+def record_source(output_dir, seconds, sample_rate=22050):
+    """Record one take from the microphone into ``output_dir`` to use as a source."""
+    import sounddevice as sd
+
+    print("Recording...")
+    take = sd.rec(int(seconds * sample_rate), samplerate=sample_rate, channels=1, dtype='int16')
+    sd.wait()
+    print("Finished recording.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav")
+    with open(path, "wb") as wav_file:
+        wav_file.write(encode_wav(take, sample_rate))
+    print(f"Recording saved to {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Cut a seeded test set of noisy clips out of long WAV recordings, in parallel.")
+    parser.add_argument("source", help="Directory tree of 16-bit WAV source recordings")
+    parser.add_argument("output", help="Directory for the clips, manifest.jsonl and clips.txt")
+    parser.add_argument("-n", "--count", type=int, default=1000, help="Number of clips to generate")
+    parser.add_argument("--duration", type=float, default=5.0, help="Clip length in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed; the same seed gives the same clips")
+    parser.add_argument("--noises", help=f"Comma-separated noise profiles (default: {','.join(NOISE_PROFILES)} "
+                                         "and every file in --noise-dir)")
+    parser.add_argument("--snrs", help=f"Comma-separated SNR levels in dB (default: {','.join(map(str, SNR_LEVELS))})")
+    parser.add_argument("--noise-dir", help="Directory of WAV noise recordings, usable as profiles by file name")
+    parser.add_argument("--sample-rate", type=int, default=22050, help="Output sample rate")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--record", type=float, metavar="SECONDS",
+                        help="First record a take of this many seconds from the microphone into the source directory")
+    args = parser.parse_args()
+
+    if args.record:
+        record_source(args.source, args.record, args.sample_rate)
+    generate(args.source, args.output, args.count, args.duration, args.seed,
+             args.noises.split(",") if args.noises else None,
+             [float(snr) for snr in args.snrs.split(",")] if args.snrs else None,
+             args.noise_dir, args.sample_rate, args.workers)
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from services.Metrics import percentiles
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXE_SUFFIX = ".exe" if sys.platform == "win32" else ""
+
+# Launch command and extra environment for each startup profile
+PROFILES = {
+    "source-eager": ([sys.executable, os.path.join(HERE, "App.py")], {"MSEE_EAGER_STARTUP": "1"}),
+    "source-lazy": ([sys.executable, os.path.join(HERE, "App.py")], {}),
+    "onefile": ([os.path.join(HERE, "dist", "Msee" + EXE_SUFFIX)], {}),  # pyinstaller Msee.spec
+    "onedir": ([os.path.join(HERE, "dist", "Msee-onedir", "Msee" + EXE_SUFFIX)], {}),  # pyinstaller Msee-onedir.spec
+}
+MILESTONES = ["first_paint", "ready"]
+
+
+def launch(command, env, timeout):
+    """Start the app once and return seconds from launch to each milestone it reports."""
+    with tempfile.TemporaryDirectory(prefix="msee-startup-") as directory:
+        report_path = os.path.join(directory, "startup.json")
+        env = dict(os.environ, MSEE_STARTUP_REPORT=report_path, **env)
+        started = time.time()
+        subprocess.run(command, env=env, cwd=HERE, timeout=timeout, check=False,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not os.path.exists(report_path):
+            return None
+        with open(report_path, "r", encoding="utf-8") as report_file:
+            marks = json.load(report_file)
+    return {milestone: marks[milestone] - started for milestone in MILESTONES}
+
+
+def run_profile(name, runs, timeout):
+    command, env = PROFILES[name]
+    if not os.path.exists(command[-1]):
+        print(f"{name}: {command[-1]} not found, skipped")
+        return None
+
+    samples = {milestone: [] for milestone in MILESTONES}
+    failures = 0
+    for _ in range(runs):
+        result = launch(command, env, timeout)
+        if result is None:
+            failures += 1
+            continue
+        for milestone in MILESTONES:
+            samples[milestone].append(result[milestone])
+    report = {milestone: percentiles(values) for milestone, values in samples.items()}
+    report["failures"] = failures
+    return report
+
+
+def print_table(reports):
+    print(f"{'profile':<14}{'paint p50':>11}{'paint p95':>11}{'ready p50':>11}{'ready p95':>11}{'failed':>8}")
+    for name, report in reports.items():
+        paint, ready = report["first_paint"], report["ready"]
+        if not paint["count"]:
+            print(f"{name:<14}{'-':>11}{'-':>11}{'-':>11}{'-':>11}{report['failures']:>8}")
+            continue
+        print(f"{name:<14}{paint['p50'] * 1000:>9.0f}ms{paint['p95'] * 1000:>9.0f}ms"
+              f"{ready['p50'] * 1000:>9.0f}ms{ready['p95'] * 1000:>9.0f}ms{report['failures']:>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Measure time-to-first-paint and time-to-ready-to-record for each startup profile.")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Launches per profile")
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help=f"Comma-separated profiles: {', '.join(PROFILES)}")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds before a launch counts as failed")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    reports = {}
+    for name in args.profiles.split(","):
+        report = run_profile(name, args.runs, args.timeout)
+        if report is not None:
+            reports[name] = report
+    print_table(reports)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(reports, output_file, indent=2)
@@ -0,0 +1,174 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+
+class StubRecognitionServer:
+    """Local stand-in for the ``/recognize/upload`` and ``/recognize/result`` endpoints.
+
+    A job becomes ready ``delay`` (+ uniform ``jitter``) seconds after its upload; until then
+    ``/result`` returns an empty ``list_result``. ``result_count`` and ``payload_bytes`` shape the
+    final response, ``long_poll`` makes ``/result`` honour the client's ``wait`` field and advertise
+    it on upload, and ``retry_after`` adds that hint to pending responses. Every upload is answered
+    with the same songs; ``score`` gives the top one that match score (lower ranks get less), for
+    clients that stop early on confident matches. Album art is served from ``/thumb.jpg`` so
+    thumbnail loading is exercised too.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=1.0, jitter=0.2, result_count=5, payload_bytes=0,
+                 long_poll=False, retry_after=None, score=None, seed=0):
+        self.delay = delay
+        self.jitter = jitter
+        self.result_count = result_count
+        self.payload_bytes = payload_bytes
+        self.long_poll = long_poll
+        self.retry_after = retry_after
+        self.score = score
+        self.random = random.Random(seed)
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.upload_count = 0
+        self.result_count_served = 0
+        self.bytes_received = 0
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "default_album.jpg"),
+                  "rb") as image_file:
+            self.thumbnail = image_file.read()
+
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/recognize"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def create_job(self, body_size):
+        with self.lock:
+            job_id = str(next(self.job_ids))
+            ready_at = time.monotonic() + self.delay + self.random.uniform(0, self.jitter)
+            self.jobs[job_id] = ready_at
+            self.upload_count += 1
+            self.bytes_received += body_size
+        response = {"job_id": job_id, "token": f"token-{job_id}"}
+        if self.long_poll:
+            response["long_poll"] = True
+        return response
+
+    def job_result(self, job_id, wait=None):
+        with self.lock:
+            self.result_count_served += 1
+            ready_at = self.jobs.get(job_id)
+        if ready_at is None:
+            return None
+
+        remaining = ready_at - time.monotonic()
+        if remaining > 0 and self.long_poll and wait:
+            time.sleep(min(remaining, float(wait)))
+            remaining = ready_at - time.monotonic()
+
+        if remaining > 0:
+            response = {"list_result": []}
+            if self.retry_after is not None:
+                response["retry_after"] = self.retry_after
+            return response
+        return {"list_result": [self.song(job_id, rank) for rank in range(self.result_count)]}
+
+    def song(self, job_id, rank):
+        song = {
+            "title": f"Stub song {job_id}.{rank}",
+            "artistsNames": "Stub artist",
+            "category": "Stub",
+            "duration": 215,
+            "link": f"/stub/{rank}",  # Same song for every upload, as when one clip is replayed
+            "releaseDate": 1700000000,
+            "thumbnailM": f"{self.base_url}/thumb.jpg?song={job_id}.{rank}",
+            "mp3url": "",
+        }
+        if self.score is not None:
+            song["score"] = self.score // (rank + 1)
+        if self.payload_bytes:
+            song["padding"] = "x" * (self.payload_bytes // max(self.result_count, 1))
+        return song
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the production API
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path = urlparse(self.path).path
+                if path.endswith("/upload") or path.endswith("/upload_fingerprint"):
+                    self.send_json(200, server.create_job(len(body)))
+                elif path.endswith("/result"):
+                    request = json.loads(body or b"{}")
+                    result = server.job_result(request.get("job_id"), request.get("wait"))
+                    if result is None:
+                        self.send_json(404, {"error": "unknown job"})
+                    else:
+                        self.send_json(200, result)
+                else:
+                    self.send_json(404, {"error": "not found"})
+
+            def do_GET(self):
+                if urlparse(self.path).path == "/thumb.jpg":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "image/jpeg")
+                    self.send_header("Content-Length", str(len(server.thumbnail)))
+                    self.send_header("ETag", '"stub-thumb"')
+                    self.end_headers()
+                    self.wfile.write(server.thumbnail)
+                else:
+                    self.send_json(404, {"error": "not found"})
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local stub of the recognition API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds until a job has results")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Extra random delay in seconds")
+    parser.add_argument("--results", type=int, default=5, help="Entries in list_result")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Padding added to the result payload")
+    parser.add_argument("--long-poll", action="store_true", help="Hold /result requests until ready")
+    parser.add_argument("--score", type=int, default=None, help="Match score reported for the top result")
+    args = parser.parse_args()
+
+    stub = StubRecognitionServer(port=args.port, delay=args.delay, jitter=args.jitter, result_count=args.results,
+                                 payload_bytes=args.payload_bytes, long_poll=args.long_poll, score=args.score)
+    print(f"Stub recognition API at {stub.api_url}")
+    stub.httpd.serve_forever()
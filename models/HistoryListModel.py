@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractListModel, QDateTime, QModelIndex, Qt
+
+from models.SongListModel import PlayingRole, SongListModel, SongRole
+
+
+class HistoryListModel(QAbstractListModel):
+    """Recognition history read from a ``HistoryStore`` one page at a time.
+
+    ``rowCount`` is the full number of matching entries, but only pages the view actually paints
+    are queried, and at most ``max_pages`` of them are kept, so opening and scrolling a history of
+    any size costs the same time and memory. Pages are read by keyset (``(recognized_at, id)`` of
+    the previous page's last row) rather than by offset; the keys of visited page boundaries are
+    remembered, so a jump only skips index entries from the nearest known boundary. Rows carry the
+    same roles as ``SongListModel``, so ``SongItemDelegate`` paints them.
+    """
+
+    def __init__(self, store, page_size=200, max_pages=10, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = OrderedDict()  # Page number -> [(SongMetadata, entry)], least recently used first
+        self.boundaries = {0: None}  # Page number -> key of the row before it (None: the newest entry)
+        self.total = 0
+        self.search = None
+
+    def refresh(self, search=None):
+        """Re-count the (optionally filtered) history and drop cached pages, e.g. after new entries."""
+        self.beginResetModel()
+        self.search = search or None
+        self.pages.clear()
+        self.boundaries = {0: None}
+        self.total = self.store.count(self.search)
+        self.endResetModel()
+
+    def row_entry(self, row):
+        number = row // self.page_size
+        page = self.pages.get(number)
+        if page is None:
+            before = self.boundary(number)
+            # No key past the first page means the history shrank since it was counted
+            entries = self.store.page(self.page_size, before, self.search) if number == 0 or before else []
+            if len(entries) == self.page_size:
+                last = entries[-1]
+                self.boundaries[number + 1] = (last["recognized_at"], last["id"])
+            page = [(SongListModel.song_from_result(entry), entry) for entry in entries]
+            self.pages[number] = page
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(number)
+        index = row % self.page_size
+        return page[index] if index < len(page) else (None, None)
+
+    def boundary(self, number):
+        if number not in self.boundaries:
+            known = max(known for known in self.boundaries if known < number)
+            self.boundaries[number] = self.store.key_at((number - known) * self.page_size - 1,
+                                                        self.boundaries[known], self.search)
+        return self.boundaries[number]
+
+    def song(self, row):
+        return self.row_entry(row)[0]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.total:
+            return None
+        song, entry = self.row_entry(index.row())
+        if song is None:
+            return None  # The history shrank since it was counted
+        if role == Qt.DisplayRole:
+            return song.title
+        if role == Qt.ToolTipRole:
+            when = QDateTime.fromMSecsSinceEpoch(int(entry["recognized_at"] * 1000)).toString("HH:mm dd/MM/yyyy")
+            latency = f" · {entry['latency']:.1f} s" if entry["latency"] is not None else ""
+            return f"{song.title} – {song.artistsNames}\n{when}{latency}"
+        if role == SongRole:
+            return song
+        if role == PlayingRole:
+            return False
+        return None
+
+    def thumbnail_ready(self, image_url):
+        for number, page in self.pages.items():
+            for index, (song, _) in enumerate(page):
+                if song.thumbnailM == image_url:
+                    row = number * self.page_size + index
+                    self.dataChanged.emit(self.index(row), self.index(row), [Qt.DecorationRole])
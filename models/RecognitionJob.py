@@ -0,0 +1,20 @@
+import itertools
+import threading
+import time
+
+
+class RecognitionJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, audio_data=None, sample_rate=22050, timeout=30):
+        self.id = next(self._ids)
+        self.audio_data = audio_data  # None for jobs that capture their own audio (streaming)
+        self.sample_rate = sample_rate
+        self.deadline = time.monotonic() + timeout  # Hard limit for the whole recognition
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
@@ -0,0 +1,78 @@
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+from models.SongMetadata import SongMetadata
+
+SongRole = Qt.UserRole + 1  # The row's SongMetadata
+PlayingRole = Qt.UserRole + 2  # Whether the row's preview is currently playing
+
+
+class SongListModel(QAbstractListModel):
+    """Flat list of songs for a view with a painting delegate.
+
+    Rows hold only ``SongMetadata``; thumbnails are looked up in the shared pixmap cache at paint
+    time, so memory does not grow with per-row widgets however many candidates are shown.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.songs = []
+        self.rows_by_thumbnail = {}  # Thumbnail URL -> rows showing it, to repaint when it arrives
+        self.playing_row = None
+
+    @staticmethod
+    def song_from_result(result):
+        return SongMetadata(
+            title=result.get('title', 'Unknown'),
+            artistsNames=result.get('artistsNames', 'Unknown'),
+            category=result.get('category', 'Unknown'),
+            duration=result.get('duration', 0),
+            link=result.get('link', ''),
+            releaseDate=result.get('releaseDate', 0),
+            thumbnailM=result.get('thumbnailM', ''),
+            mp3url=result.get('mp3url', '')
+        )
+
+    def set_results(self, results):
+        """Replace the rows with songs built from API result dicts."""
+        self.set_songs([self.song_from_result(result) for result in results])
+
+    def set_songs(self, songs):
+        self.beginResetModel()
+        self.songs = list(songs)
+        self.playing_row = None
+        self.rows_by_thumbnail = {}
+        for row, song in enumerate(self.songs):
+            self.rows_by_thumbnail.setdefault(song.thumbnailM, []).append(row)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_songs([])
+
+    def song(self, row):
+        return self.songs[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.songs)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.songs):
+            return None
+        song = self.songs[index.row()]
+        if role == Qt.DisplayRole:
+            return song.title
+        if role == Qt.ToolTipRole:
+            return f"{song.title} – {song.artistsNames}"
+        if role == SongRole:
+            return song
+        if role == PlayingRole:
+            return index.row() == self.playing_row
+        return None
+
+    def set_playing_row(self, row):
+        previous, self.playing_row = self.playing_row, row
+        for changed in {previous, row} - {None}:
+            self.dataChanged.emit(self.index(changed), self.index(changed), [PlayingRole])
+
+    def thumbnail_ready(self, image_url):
+        for row in self.rows_by_thumbnail.get(image_url, []):
+            self.dataChanged.emit(self.index(row), self.index(row), [Qt.DecorationRole])
@@ -0,0 +1,142 @@
+import io
+import time
+import wave
+
+import numpy as np
+
+try:
+    import soundfile as sf
+except ImportError:  # FLAC/Opus need libsndfile; without it every upload stays WAV
+    sf = None
+# Opus in OGG arrived in libsndfile 1.0.29; older builds only get FLAC
+OPUS_SUPPORTED = sf is not None and 'OPUS' in sf.available_subtypes('OGG')
+
+
+def encode_wav(audio_data, sample_rate):
+    """Wrap a captured mono buffer in an in-memory 16-bit PCM WAV container."""
+    with io.BytesIO() as buffer:
+        with wave.open(buffer, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(to_int16(audio_data))
+        return buffer.getvalue()
+
+
+def to_int16(audio_data):
+    if audio_data.dtype != np.int16:
+        # Float captures are in [-1, 1]; scale them to the 16-bit range
+        audio_data = (np.clip(audio_data, -1.0, 1.0) * 32767).astype(np.int16)
+    return audio_data
+
+
+def low_pass(samples, cutoff, taps):
+    """Filter with a Hamming-windowed sinc FIR; ``cutoff`` is in cycles per sample."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()  # Unity gain at DC
+    return np.convolve(samples, kernel.astype(np.float32), mode='same')
+
+
+def resample(audio_data, sample_rate, target_rate):
+    if sample_rate == target_rate:
+        return audio_data
+    samples = audio_data.reshape(-1).astype(np.float32)
+    if target_rate < sample_rate:
+        # Remove content above the new Nyquist first, or interpolation folds it back into the band.
+        # Cut at 90% of it and scale the length with the ratio so the transition band ends near Nyquist.
+        ratio = sample_rate / target_rate
+        samples = low_pass(samples, 0.45 / ratio, 2 * int(16 * ratio) + 1)
+    target_length = int(len(samples) * target_rate / sample_rate)
+    positions = np.linspace(0, len(samples) - 1, target_length)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(audio_data.dtype)
+
+
+class EncodedAudio:
+    def __init__(self, data, codec, filename, mime_type, raw_size, encode_time):
+        self.data = data
+        self.codec = codec
+        self.filename = filename
+        self.mime_type = mime_type
+        self.raw_size = raw_size  # Size of the equivalent 16-bit PCM payload in bytes
+        self.encode_time = encode_time  # Seconds spent encoding
+
+    @property
+    def compression_ratio(self):
+        return self.raw_size / len(self.data) if self.data else 0.0
+
+    def summary(self):
+        return (f"{self.codec}: {len(self.data)} bytes, {self.compression_ratio:.1f}x smaller, "
+                f"encoded in {self.encode_time * 1000:.1f} ms")
+
+
+class AudioEncoder:
+    """Encode recordings before upload, picking WAV, FLAC or Opus by configuration or measured uplink.
+
+    With ``codec='auto'`` the uplink bandwidth is estimated from recent uploads: slow links get
+    Opus, moderate links get lossless FLAC and fast links skip encoding with plain WAV.
+    """
+    CODECS = {
+        'wav': ('recorded_audio.wav', 'audio/wav'),
+        'flac': ('recorded_audio.flac', 'audio/flac'),
+        'opus': ('recorded_audio.opus', 'audio/ogg'),
+    }
+    OPUS_SAMPLE_RATE = 16000  # Opus only accepts 8/12/16/24/48 kHz input
+
+    def __init__(self, codec='wav', opus_below=32_000, flac_below=1_000_000, opus_compression=0.95):
+        if codec != 'auto' and codec not in self.CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.codec = codec
+        self.opus_below = opus_below  # Uplink bytes/s under which Opus is used
+        self.flac_below = flac_below  # Uplink bytes/s under which FLAC is used
+        self.opus_compression = opus_compression  # libsndfile maps 0..1 onto high..low Opus bitrate (0.95 ~ 16 kbps)
+        self.uplink_bandwidth = None  # Smoothed bytes/s, None until the first upload
+
+    def choose_codec(self):
+        if self.codec != 'auto':
+            codec = self.codec
+        elif self.uplink_bandwidth is None:
+            codec = 'flac'
+        elif self.uplink_bandwidth < self.opus_below:
+            codec = 'opus'
+        elif self.uplink_bandwidth < self.flac_below:
+            codec = 'flac'
+        else:
+            codec = 'wav'
+
+        if sf is None and codec != 'wav':
+            return 'wav'
+        if codec == 'opus' and not OPUS_SUPPORTED:
+            return 'flac'
+        return codec
+
+    def encode(self, audio_data, sample_rate):
+        codec = self.choose_codec()
+        filename, mime_type = self.CODECS[codec]
+        audio_data = to_int16(audio_data)
+
+        start = time.perf_counter()
+        if codec == 'wav':
+            data = encode_wav(audio_data, sample_rate)
+        else:
+            with io.BytesIO() as buffer:
+                if codec == 'flac':
+                    sf.write(buffer, audio_data, sample_rate, format='FLAC', subtype='PCM_16')
+                else:
+                    sf.write(buffer, resample(audio_data, sample_rate, self.OPUS_SAMPLE_RATE),
+                             self.OPUS_SAMPLE_RATE, format='OGG', subtype='OPUS',
+                             compression_level=self.opus_compression)
+                data = buffer.getvalue()
+        encode_time = time.perf_counter() - start
+
+        return EncodedAudio(data, codec, filename, mime_type, audio_data.nbytes, encode_time)
+
+    def record_upload(self, num_bytes, seconds):
+        """Feed back an upload's size and duration to refine the bandwidth estimate."""
+        if seconds <= 0:
+            return
+        sample = num_bytes / seconds
+        if self.uplink_bandwidth is None:
+            self.uplink_bandwidth = sample
+        else:
+            self.uplink_bandwidth = 0.7 * self.uplink_bandwidth + 0.3 * sample
@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+
+from services.AudioEncoder import resample, to_int16
+from services.Metrics import metrics
+
+ANALYSIS_RATE = 11025  # Clips are analysed at this rate; enough bandwidth to tell music from noise
+FRAME = 1024
+HOP = 512
+EPSILON = 1e-10
+BAND_EDGES = np.array([4, 8, 16, 32, 64, 128, 256])  # Octave bands (rfft bins) above ~40 Hz
+
+
+def analyze(audio_data, sample_rate):
+    """Summarise a clip with a few cheap, fully vectorised features.
+
+    Returns a dict with the overall ``rms_dbfs``, the ``active_fraction`` of frames above the
+    silence floor, the median ``flatness`` of active frames (near 1 for noise, low for tonal
+    sound), the ``low_energy_ratio`` (the share of frames, pauses included, well below the mean
+    level; high for speech) and a ``music_score`` in [0, 1] combining the three.
+    """
+    samples = to_int16(np.asarray(audio_data)).reshape(-1).astype(np.float32) / 32768
+    samples = resample(samples, sample_rate, ANALYSIS_RATE)
+    if len(samples) < FRAME:
+        samples = np.pad(samples, (0, FRAME - len(samples)))
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP]
+    frame_rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    frame_db = 20 * np.log10(frame_rms + EPSILON)
+    rms_dbfs = float(20 * np.log10(np.sqrt(np.mean(np.square(samples))) + EPSILON))
+
+    active = frame_db > AudioGate.SILENCE_FLOOR_DBFS
+    active_fraction = float(active.mean())
+    if not active.any():
+        return {"rms_dbfs": rms_dbfs, "active_fraction": 0.0, "flatness": 1.0, "low_energy_ratio": 1.0,
+                "music_score": 0.0}
+
+    # Flatness is measured per octave band, so coloured (pink, brown) noise still reads as noise,
+    # then weighted by band energy so near-empty bands holding only the noise floor don't count
+    power = np.square(np.abs(np.fft.rfft(frames[active] * np.hanning(FRAME).astype(np.float32), axis=1)))
+    widths = np.diff(np.append(BAND_EDGES, power.shape[1]))
+    band_energy = np.add.reduceat(power, BAND_EDGES, axis=1)
+    log_mean = np.add.reduceat(np.log(power + EPSILON), BAND_EDGES, axis=1) / widths
+    band_flatness = np.exp(log_mean) / (band_energy / widths + EPSILON)
+    weights = band_energy / (band_energy.sum(axis=1, keepdims=True) + EPSILON)
+    flatness = float(np.median(np.sum(band_flatness * weights, axis=1)))
+
+    # Pauses count as low-energy frames too, which is what separates speech from music
+    low_energy_ratio = float(np.mean(frame_rms < 0.5 * frame_rms.mean()))
+
+    music_score = active_fraction * (1 - flatness) * (1 - low_energy_ratio)
+    return {"rms_dbfs": rms_dbfs, "active_fraction": active_fraction, "flatness": flatness,
+            "low_energy_ratio": low_energy_ratio, "music_score": float(music_score)}
+
+
+class AudioGate:
+    """Reject clips locally that cannot produce a match: silence, broadband noise or non-music.
+
+    ``check`` returns ``None`` when a clip should be uploaded, otherwise the reason to show the
+    user. Rejections are counted per reason (and as ``uploads_avoided`` in the metrics), so the
+    saving is visible in ``stats``.
+    """
+    SILENCE_FLOOR_DBFS = -50  # Frames quieter than this count as silence
+
+    def __init__(self, min_rms_dbfs=-45, max_flatness=0.4, min_music_score=0.4):
+        self.min_rms_dbfs = min_rms_dbfs
+        self.max_flatness = max_flatness
+        self.min_music_score = min_music_score
+        self.checked = 0
+        self.rejected = {"silence": 0, "noise": 0, "not_music": 0}
+        self.last_features = None
+        self.last_check_time = 0.0
+
+    def check(self, audio_data, sample_rate):
+        start = time.perf_counter()
+        features = analyze(audio_data, sample_rate)
+        self.last_check_time = time.perf_counter() - start
+        self.last_features = features
+        self.checked += 1
+
+        if features["rms_dbfs"] < self.min_rms_dbfs:
+            return self.reject("silence", "Không nghe thấy âm thanh, hãy đưa máy lại gần nguồn nhạc")
+        if features["flatness"] > self.max_flatness:
+            return self.reject("noise", "Chỉ nghe thấy tiếng ồn, không nhận ra âm nhạc")
+        if features["music_score"] < self.min_music_score:
+            return self.reject("not_music", "Không nghe thấy âm nhạc rõ ràng, hãy thử lại")
+        return None
+
+    def reject(self, reason, message):
+        self.rejected[reason] += 1
+        metrics.increment("uploads_avoided")
+        metrics.increment(f"uploads_avoided_{reason}")
+        return message
+
+    def stats(self):
+        avoided = sum(self.rejected.values())
+        return {
+            "checked": self.checked,
+            "uploads_avoided": avoided,
+            "avoided_rate": avoided / self.checked if self.checked else 0.0,
+            **{f"avoided_{reason}": count for reason, count in self.rejected.items()},
+        }
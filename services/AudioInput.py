@@ -0,0 +1,84 @@
+import threading
+import time
+
+import sounddevice as sd
+
+from services.AudioRingBuffer import AudioRingBuffer
+
+
+class AudioInput:
+    """One input stream kept open for the app's lifetime, recording into a preallocated ring buffer.
+
+    Opening the PortAudio device is slow on some USB interfaces and clips the start of a take, so
+    the stream is opened once (``start``) and every capture reads from the ring instead. Because
+    audio keeps flowing, a capture can include ``pre_roll`` seconds from before the button press.
+    Listeners added with ``add_listener`` see every block from the audio callback.
+    """
+
+    def __init__(self, sample_rate=22050, buffer_seconds=30, block_duration=0.1, device=None):
+        self.sample_rate = sample_rate
+        self.block_duration = block_duration
+        self.device = device
+        self.ring = AudioRingBuffer(int(buffer_seconds * sample_rate))
+        self.stream = None
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    @property
+    def frames_written(self):
+        return self.ring.frames_written
+
+    def start(self):
+        """Open the stream if it is not running; raises the PortAudio error when the device can't be opened."""
+        with self.lock:
+            if self.stream is not None and self.stream.active:
+                return
+            if self.stream is not None:
+                self.stream.close()  # The device went away; reopen it
+            self.stream = sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='int16', device=self.device,
+                                         blocksize=int(self.block_duration * self.sample_rate),
+                                         callback=self.on_block)
+            self.stream.start()
+
+    def stop(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.stop()
+                self.stream.close()
+                self.stream = None
+
+    def on_block(self, indata, frame_count, time_info, status):
+        self.ring.write(indata)
+        for listener in self.listeners:
+            listener(indata, frame_count)
+
+    def add_listener(self, listener):
+        self.listeners = self.listeners + [listener]  # Copy so the callback never sees a list mid-change
+
+    def remove_listener(self, listener):
+        self.listeners = [existing for existing in self.listeners if existing is not listener]
+
+    def mark(self, pre_roll=0.0):
+        """Frame index a capture starting now should begin at, reaching back up to ``pre_roll`` seconds."""
+        self.start()
+        frames_written = self.ring.frames_written
+        return max(frames_written - int(pre_roll * self.sample_rate), frames_written - self.ring.available)
+
+    def wait_for(self, frame, cancelled=None, timeout=None):
+        """Block until ``frame`` frames have been written; returns False if cancelled or timed out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.ring.frames_written < frame:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if cancelled is not None:
+                if cancelled.wait(self.block_duration / 2):
+                    return False
+            else:
+                time.sleep(self.block_duration / 2)
+        return True
+
+    def read(self, start, count, out=None):
+        return self.ring.read(start, count, out)
+
+    def latest(self, count, out=None):
+        return self.ring.latest(count, out)
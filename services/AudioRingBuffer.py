@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Fixed-size circular buffer of audio frames, written by the input callback and read by workers.
+
+    Memory is allocated once up front, so a stream can run indefinitely while only the most recent
+    ``capacity`` frames are kept.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.int16):
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, channels), dtype=dtype)
+        self.frames_written = 0  # Total frames ever written; the write position is this modulo capacity
+        self.lock = threading.Lock()
+
+    @property
+    def available(self):
+        return min(self.frames_written, self.capacity)
+
+    def write(self, frames):
+        total = len(frames)
+        with self.lock:
+            # Only the newest capacity frames can be kept
+            kept = frames[max(total - self.capacity, 0):]
+            count = len(kept)
+            start = (self.frames_written + total - count) % self.capacity
+            first = min(count, self.capacity - start)
+            self.buffer[start:start + first] = kept[:first]
+            self.buffer[:count - first] = kept[first:]
+            self.frames_written += total
+
+    def latest(self, count, out=None):
+        """Copy the newest ``count`` frames (fewer if not yet written) in chronological order.
+
+        ``out`` may be a preallocated array of at least ``count`` frames to copy into; the filled
+        leading slice of it is returned.
+        """
+        with self.lock:
+            count = min(count, self.available)
+            if out is None:
+                out = np.empty((count, self.buffer.shape[1]), dtype=self.buffer.dtype)
+            start = (self.frames_written - count) % self.capacity
+            first = min(count, self.capacity - start)
+            out[:first] = self.buffer[start:start + first]
+            out[first:count] = self.buffer[:count - first]
+        return out[:count]
+
+    def read(self, start, count, out=None):
+        """Copy ``count`` frames starting at absolute frame ``start`` (as counted by ``frames_written``).
+
+        Raises ``ValueError`` when part of that range has already been overwritten or not yet written.
+        """
+        with self.lock:
+            if start < self.frames_written - self.available or start + count > self.frames_written:
+                raise ValueError(f"Frames {start}-{start + count} are not in the buffer")
+            if out is None:
+                out = np.empty((count, self.buffer.shape[1]), dtype=self.buffer.dtype)
+            index = start % self.capacity
+            first = min(count, self.capacity - index)
+            out[:first] = self.buffer[index:index + first]
+            out[first:count] = self.buffer[:count - first]
+        return out[:count]
+
+    def clear(self):
+        with self.lock:
+            self.frames_written = 0
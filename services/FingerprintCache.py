@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from services.Fingerprinter import landmark_hashes, match_score
+
+
+class FingerprintCache:
+    """Local TTL/LRU cache from clip fingerprints to the ``list_result`` they were recognised as.
+
+    Entries are keyed by the recognised song, and every clip resolved to that song adds its landmark
+    hashes to the entry, so repeated presses during the same track cover more of it over time. A new
+    clip whose hashes line up with an entry at one consistent offset is answered from the cache.
+    """
+    GAP = 100_000  # Frames inserted between merged clips so hashes from different clips never align
+
+    def __init__(self, ttl=15 * 60, max_entries=50, max_hashes=20_000, min_score=12):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_hashes = max_hashes  # Per entry; the oldest clips are dropped first
+        self.min_score = min_score  # Aligned hashes needed to call a clip a near-duplicate
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.saved_round_trips = 0
+
+    def fingerprint(self, audio_data, sample_rate):
+        return landmark_hashes(audio_data, sample_rate)
+
+    def lookup(self, fingerprint):
+        """Return the cached result data for a near-duplicate clip, or ``None``."""
+        hashes, times = fingerprint
+        with self.lock:
+            self.lookups += 1
+            self.expire()
+            best_key, best_score = None, 0
+            for key, entry in self.entries.items():
+                score, _ = match_score(hashes, times, entry["hashes"], entry["times"], ref_sorted=True)
+                if score > best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None or best_score < self.min_score:
+                return None
+
+            entry = self.entries[best_key]
+            self.entries.move_to_end(best_key)
+            self.hits += 1
+            self.saved_round_trips += entry["round_trips"]
+            return entry["result"]
+
+    def store(self, fingerprint, result_data, round_trips=1):
+        """Remember the result a clip resolved to; ``round_trips`` is what the network lookup cost."""
+        hashes, times = fingerprint
+        if not result_data.get("list_result") or len(hashes) == 0:
+            return
+        key = song_key(result_data["list_result"][0])
+
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                # Keep clips in arrival order so trimming drops the oldest ones
+                times = times.astype(np.int64) + entry["clip_times"].max() + self.GAP
+                hashes = np.concatenate([entry["clip_hashes"], hashes])[-self.max_hashes:]
+                times = np.concatenate([entry["clip_times"], times])[-self.max_hashes:]
+                # Start again from zero, so offsets stay bounded by the clips kept, not all clips ever seen
+                times = times - times.min()
+
+            order = np.argsort(hashes, kind="stable")
+            self.entries[key] = {
+                "clip_hashes": hashes,
+                "clip_times": times,
+                "hashes": hashes[order],
+                "times": times[order],
+                "result": result_data,
+                "round_trips": round_trips,
+                "expires": time.monotonic() + self.ttl,
+            }
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def expire(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self.entries.items() if entry["expires"] < now]:
+            del self.entries[key]
+
+    def stats(self):
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "saved_round_trips": self.saved_round_trips,
+        }
+
+
+def song_key(song):
+    return song.get("link") or (song.get("title", ""), song.get("artistsNames", ""))
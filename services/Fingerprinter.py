@@ -0,0 +1,134 @@
+import struct
+import time
+
+import numpy as np
+
+from services.AudioEncoder import EncodedAudio, resample
+
+SAMPLE_RATE = 11025  # Every clip is fingerprinted at this rate so hashes are comparable
+N_FFT = 1024
+HOP = 256
+PEAK_NEIGHBOURHOOD = (11, 11)  # Frames x bins a peak must dominate
+FAN_OUT = 8  # Partner peaks paired with each anchor
+MAX_DT = 63  # Largest anchor-to-partner distance in frames
+FORMAT_VERSION = 1
+
+
+def spectrogram(samples):
+    """Log-magnitude STFT of mono samples as a ``(frames, bins)`` float32 array."""
+    if len(samples) < N_FFT:
+        samples = np.pad(samples, (0, N_FFT - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, N_FFT)[::HOP]
+    spectrum = np.fft.rfft(frames * np.hanning(N_FFT).astype(np.float32), axis=1)
+    return np.log1p(np.abs(spectrum)).astype(np.float32)
+
+
+def max_filter(values, size, axis):
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (size // 2, size // 2)
+    padded = np.pad(values, pad, mode="constant", constant_values=-np.inf)
+    return np.lib.stride_tricks.sliding_window_view(padded, size, axis=axis).max(axis=-1)
+
+
+def find_peaks(spec):
+    """Return ``(frame, bin)`` index arrays of local maxima that stand out from the background."""
+    local_max = max_filter(max_filter(spec, PEAK_NEIGHBOURHOOD[0], 0), PEAK_NEIGHBOURHOOD[1], 1)
+    threshold = np.median(spec) + 2 * spec.std()
+    frames, bins = np.nonzero((spec == local_max) & (spec > threshold))
+    return frames, bins
+
+
+def landmark_hashes(audio_data, sample_rate):
+    """Fingerprint a clip as spectrogram-peak landmark hashes.
+
+    Each peak is paired with the next ``FAN_OUT`` peaks within ``MAX_DT`` frames; the pair's two
+    frequency bins and time gap pack into one ``uint32`` hash. Returns the hashes together with the
+    anchor frame of each hash, which is what alignment between two clips is scored on.
+    """
+    samples = resample(np.asarray(audio_data).reshape(-1), sample_rate, SAMPLE_RATE).astype(np.float32)
+    frames, bins = find_peaks(spectrogram(samples))
+
+    order = np.lexsort((bins, frames))
+    frames, bins = frames[order], bins[order]
+
+    hashes = []
+    times = []
+    for step in range(1, FAN_OUT + 1):
+        anchor_frames, target_frames = frames[:-step], frames[step:]
+        anchor_bins, target_bins = bins[:-step], bins[step:]
+        dt = target_frames - anchor_frames
+        valid = (dt > 0) & (dt <= MAX_DT)
+        hashes.append((anchor_bins[valid].astype(np.uint32) << 22)
+                      | (target_bins[valid].astype(np.uint32) << 12)
+                      | dt[valid].astype(np.uint32))
+        times.append(anchor_frames[valid].astype(np.int32))
+
+    if not hashes:
+        return np.empty(0, np.uint32), np.empty(0, np.int32)
+    return np.concatenate(hashes), np.concatenate(times)
+
+
+def encode_fingerprint(audio_data, sample_rate):
+    """Pack a clip's landmarks for upload in place of its audio.
+
+    Layout (little-endian): ``b"MSFP"``, version, fingerprint sample rate, hop and hash count as
+    ``<4sHHHI``, then the ``uint32`` hashes, then their ``uint16`` anchor frames.
+    """
+    start = time.perf_counter()
+    hashes, times = landmark_hashes(audio_data, sample_rate)
+    header = struct.pack("<4sHHHI", b"MSFP", FORMAT_VERSION, SAMPLE_RATE, HOP, len(hashes))
+    data = header + hashes.astype("<u4").tobytes() + times.astype("<u2").tobytes()
+    encode_time = time.perf_counter() - start
+    return EncodedAudio(data, "fingerprint", "fingerprint.bin", "application/octet-stream",
+                        np.asarray(audio_data).size * 2, encode_time)
+
+
+def decode_fingerprint(data):
+    """Unpack an ``encode_fingerprint`` payload back into ``(hashes, anchor frames)``."""
+    header_size = struct.calcsize("<4sHHHI")
+    magic, version, sample_rate, hop, count = struct.unpack_from("<4sHHHI", data)
+    if magic != b"MSFP" or version != FORMAT_VERSION or sample_rate != SAMPLE_RATE or hop != HOP:
+        raise ValueError("incompatible fingerprint payload")
+    hashes = np.frombuffer(data, "<u4", count, header_size).astype(np.uint32)
+    times = np.frombuffer(data, "<u2", count, header_size + 4 * count).astype(np.int32)
+    return hashes, times
+
+
+def match_score(query_hashes, query_times, ref_hashes, ref_times, ref_sorted=False):
+    """Count the query hashes that line up with the reference at one consistent time offset.
+
+    Returns ``(score, offset)``; ``offset`` is in frames from the query start to the reference.
+    """
+    if not ref_sorted:
+        order = np.argsort(ref_hashes, kind="stable")
+        ref_hashes, ref_times = ref_hashes[order], ref_times[order]
+
+    left = np.searchsorted(ref_hashes, query_hashes, "left")
+    counts = np.searchsorted(ref_hashes, query_hashes, "right") - left
+    total = int(counts.sum())
+    if total == 0:
+        return 0, 0
+
+    query_index = np.repeat(np.arange(len(query_hashes)), counts)
+    ref_index = np.repeat(left - (np.cumsum(counts) - counts), counts) + np.arange(total)
+    deltas = ref_times[ref_index] - query_times[query_index]
+    offsets, votes = np.unique(deltas, return_counts=True)
+    best = int(votes.argmax())
+    return int(votes[best]), int(offsets[best])
+
+
+if __name__ == '__main__':
+    # Benchmark extraction against the 5 s capture it has to keep up with
+    capture_seconds = 5
+    rate = 22050
+    rng = np.random.default_rng(0)
+    t = np.arange(capture_seconds * rate) / rate
+    clip = sum(np.sin(2 * np.pi * rng.uniform(200, 3000) * t) for _ in range(8))
+    clip = (clip / 8 * 20000 + rng.normal(0, 1000, len(t))).astype(np.int16)
+
+    encode_fingerprint(clip, rate)  # Warm up
+    runs = [encode_fingerprint(clip, rate) for _ in range(20)]
+    best = min(run.encode_time for run in runs)
+    print(f"{len(runs[0].data)} bytes vs {clip.nbytes} bytes of PCM ({runs[0].compression_ratio:.0f}x smaller)")
+    print(f"Extraction: {best * 1000:.1f} ms for {capture_seconds} s of audio "
+          f"({best / capture_seconds * 100:.2f}% of capture time)")
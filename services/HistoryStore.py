@@ -0,0 +1,162 @@
+import queue
+import sqlite3
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+FLUSH = object()  # Queued by flush(): commit what is queued without waiting out the batch window
+SONG_FIELDS = ["title", "artistsNames", "category", "duration", "link", "releaseDate", "thumbnailM", "mp3url"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    recognized_at REAL NOT NULL,
+    latency REAL,
+    title TEXT COLLATE NOCASE,
+    artistsNames TEXT COLLATE NOCASE,
+    category TEXT,
+    duration INTEGER,
+    link TEXT,
+    releaseDate INTEGER,
+    thumbnailM TEXT,
+    mp3url TEXT
+);
+CREATE INDEX IF NOT EXISTS history_recognized_at ON history (recognized_at);
+CREATE INDEX IF NOT EXISTS history_title ON history (title);
+CREATE INDEX IF NOT EXISTS history_artists ON history (artistsNames);
+"""
+
+
+class HistoryStore(QObject):
+    """Persistent log of every identified song, in SQLite with write-ahead logging.
+
+    ``add`` only queues the entry; a writer thread commits queued entries in batches of up to
+    ``batch_size`` or every ``flush_interval`` seconds, so the GUI never waits on the disk, and
+    ``committed`` tells it when new entries can be read. Reads go through their own connection,
+    which WAL lets run alongside the writer. Title and artist columns compare case-insensitively so
+    their indexes also serve prefix searches.
+    """
+    committed = pyqtSignal(int)  # Signal carrying the number of entries a batch just wrote
+
+    def __init__(self, path, batch_size=100, flush_interval=1.0, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.written = 0
+        self.batches = 0
+
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        self.reader = None  # Opened on the first read, on the reading (GUI) thread
+        self.writer = threading.Thread(target=self.write_loop, name="HistoryStore", daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA synchronous=NORMAL")  # Durable across app crashes; WAL makes this cheap
+        return connection
+
+    def add(self, song, latency=None, recognized_at=None):
+        """Queue a result dict (as found in ``list_result``) for writing."""
+        recognized_at = time.time() if recognized_at is None else recognized_at
+        self.queue.put((recognized_at, latency, *(song.get(field) for field in SONG_FIELDS)))
+
+    def write_loop(self):
+        connection = self.connect()
+        closing = False
+        while not closing:
+            entry = self.queue.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if entry is None:
+                    closing = True
+                    break
+                if entry is FLUSH:
+                    break  # Commit what is queued right away rather than at the deadline
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    entry = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    with connection:
+                        connection.executemany(
+                            f"INSERT INTO history (recognized_at, latency, {', '.join(SONG_FIELDS)}) "
+                            f"VALUES ({', '.join('?' * (len(SONG_FIELDS) + 2))})", batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                    self.committed.emit(len(batch))
+                except sqlite3.Error as e:
+                    print(f"Failed to write recognition history: {e}")
+        connection.close()
+
+    def flush(self):
+        """Have the writer commit every entry queued so far now; returns at once, ``committed`` follows."""
+        self.queue.put(FLUSH)
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def read(self, sql, parameters=()):
+        if self.reader is None:
+            self.reader = self.connect()
+            self.reader.row_factory = sqlite3.Row
+        return self.reader.execute(sql, parameters).fetchall()
+
+    @staticmethod
+    def search_clause(search):
+        if not search:
+            return "", ()
+        # Prefix match on title or artist; both are indexed, so this stays fast on large histories
+        pattern = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return "WHERE title LIKE ? ESCAPE '\\' OR artistsNames LIKE ? ESCAPE '\\'", (pattern, pattern)
+
+    def count(self, search=None):
+        where, parameters = self.search_clause(search)
+        return self.read(f"SELECT COUNT(*) FROM history {where}", parameters)[0][0]
+
+    @staticmethod
+    def keyset_clause(search, before):
+        """WHERE clause for the entries matching ``search`` that sort after ``before``, a
+        ``(recognized_at, id)`` key, newest first; the recognized_at index serves the range."""
+        where, parameters = HistoryStore.search_clause(search)
+        if before is None:
+            return where, parameters
+        condition = "(recognized_at, id) < (?, ?)"
+        where = f"WHERE ({where[len('WHERE '):]}) AND {condition}" if where else f"WHERE {condition}"
+        return where, (*parameters, *before)
+
+    def page(self, limit, before=None, search=None):
+        """Return up to ``limit`` entries as dicts, newest first, starting after the ``before`` key."""
+        where, parameters = self.keyset_clause(search, before)
+        rows = self.read(f"SELECT * FROM history {where} ORDER BY recognized_at DESC, id DESC LIMIT ?",
+                         (*parameters, limit))
+        return [dict(row) for row in rows]
+
+    def key_at(self, skip, before=None, search=None):
+        """The ``(recognized_at, id)`` key of the entry ``skip`` places after ``before``, or ``None``.
+
+        Reads only the index, so the model can jump far down the history without loading the rows
+        it skips.
+        """
+        where, parameters = self.keyset_clause(search, before)
+        rows = self.read(f"SELECT recognized_at, id FROM history {where} "
+                         f"ORDER BY recognized_at DESC, id DESC LIMIT 1 OFFSET ?", (*parameters, skip))
+        return tuple(rows[0]) if rows else None
+
+    def stats(self):
+        return {"history_written": self.written, "history_batches": self.batches,
+                "history_queued": self.queue.qsize()}
@@ -0,0 +1,81 @@
+import json
+import os
+
+import numpy as np
+
+
+def write_shard(directory, tracks, hashes, track_ids, times):
+    """Write one index shard: sorted hashes plus parallel ``(track_id, time)`` postings.
+
+    ``tracks`` is the list of metadata dicts (``SongMetadata`` fields) that ``track_ids`` index into.
+    """
+    os.makedirs(directory, exist_ok=True)
+    order = np.argsort(hashes, kind="stable")
+    postings = np.stack([track_ids, times], axis=1).astype(np.int32)[order]
+    np.save(os.path.join(directory, "hashes.npy"), hashes.astype(np.uint32)[order])
+    np.save(os.path.join(directory, "postings.npy"), postings)
+    with open(os.path.join(directory, "tracks.json"), "w", encoding="utf-8") as tracks_file:
+        json.dump(tracks, tracks_file, ensure_ascii=False)
+
+
+class IndexShard:
+    def __init__(self, directory):
+        # Memory-mapped, so opening is instant and only the pages a lookup touches become resident
+        self.hashes = np.load(os.path.join(directory, "hashes.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(directory, "postings.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "tracks.json"), "r", encoding="utf-8") as tracks_file:
+            self.tracks = json.load(tracks_file)
+
+    def votes(self, query_hashes, query_times, max_postings):
+        """Return ``(track_ids, offsets)`` for every posting that shares a hash with the query."""
+        left = np.searchsorted(self.hashes, query_hashes, "left")
+        counts = np.searchsorted(self.hashes, query_hashes, "right") - left
+
+        # Hashes that occur everywhere carry no information and would dominate the work
+        counts[counts > max_postings] = 0
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+
+        query_index = np.repeat(np.arange(len(query_hashes)), counts)
+        posting_index = np.repeat(left - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        postings = self.postings[np.sort(posting_index)]
+        query_index = query_index[np.argsort(posting_index)]
+        return postings[:, 0].astype(np.int64), postings[:, 1].astype(np.int64) - query_times[query_index]
+
+
+class LandmarkIndex:
+    """Read-only landmark-hash inverted index made of one or more shard directories."""
+
+    def __init__(self, directory, max_postings=5000):
+        self.directory = directory
+        self.max_postings = max_postings
+        if os.path.exists(os.path.join(directory, "hashes.npy")):
+            shard_dirs = [directory]
+        else:
+            shard_dirs = sorted(entry.path for entry in os.scandir(directory)
+                                if entry.is_dir() and os.path.exists(os.path.join(entry.path, "hashes.npy")))
+        self.shards = [IndexShard(shard_dir) for shard_dir in shard_dirs]
+
+    def __len__(self):
+        return sum(len(shard.tracks) for shard in self.shards)
+
+    def search(self, query_hashes, query_times, limit=5, min_score=10):
+        """Return up to ``limit`` ``(score, track)`` pairs, best first, scored by aligned hash votes."""
+        matches = []
+        for shard in self.shards:
+            track_ids, offsets = shard.votes(query_hashes, query_times.astype(np.int64), self.max_postings)
+            if len(track_ids) == 0:
+                continue
+
+            # One vote per (track, time offset); a track's score is its best-aligned offset
+            keys, votes = np.unique((track_ids << 32) | (offsets + (1 << 31)), return_counts=True)
+            keys_by_votes = np.argsort(-votes, kind="stable")
+            _, first = np.unique(keys[keys_by_votes] >> 32, return_index=True)
+            for position in first:
+                score = int(votes[keys_by_votes[position]])
+                if score >= min_score:
+                    matches.append((score, shard.tracks[int(keys[keys_by_votes[position]] >> 32)]))
+
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
@@ -0,0 +1,61 @@
+import itertools
+import os
+
+from services.Fingerprinter import landmark_hashes
+from services.LandmarkIndex import LandmarkIndex
+from services.Metrics import metrics
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".msee", "catalogue")
+
+
+class LocalRecognitionService:
+    """Offline recogniser with the same upload/result protocol as ``SongDataService``.
+
+    Recognition runs synchronously in ``send_recording`` against a memory-mapped landmark index,
+    and ``get_result`` hands back the stored answer, so ``ProcessingThread`` and ``ResultWaiter``
+    drive it exactly like the remote API.
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, limit=5, min_score=10):
+        self.index_dir = index_dir
+        self.limit = limit
+        self.min_score = min_score
+        self.index = None
+        self.results = {}
+        self.job_ids = itertools.count(1)
+
+    def abort(self):
+        pass  # Recognition runs synchronously in the caller's thread; there is nothing in flight
+
+    def is_available(self):
+        return os.path.isdir(self.index_dir) and self.load_index() is not None and len(self.index) > 0
+
+    def load_index(self):
+        if self.index is None:
+            try:
+                self.index = LandmarkIndex(self.index_dir)
+            except (OSError, ValueError) as e:
+                # Also reached from worker threads; is_available() reports the outcome to callers
+                metrics.increment("local_index_failures")
+                metrics.log({"event": "local_index_failed", "index_dir": self.index_dir, "error": str(e)})
+        return self.index
+
+    def recognize(self, audio_data, sample_rate):
+        hashes, times = landmark_hashes(audio_data, sample_rate)
+        matches = self.load_index().search(hashes, times, self.limit, self.min_score)
+        return {"list_result": [dict(track, score=score) for score, track in matches]}
+
+    def send_recording(self, audio_data, sample_rate):
+        if self.load_index() is None:
+            return {"error": "Local index is not available"}
+        job_id = str(next(self.job_ids))
+        self.results[job_id] = self.recognize(audio_data, sample_rate)
+        return {"job_id": job_id, "token": None}
+
+    def get_result(self, job_id, token, wait=None):
+        result_data = self.results.pop(job_id, None)
+        if result_data is None:
+            return {"error": "Unknown local job"}
+        if not result_data["list_result"]:
+            return {"error": "Không tìm thấy bài hát"}
+        return result_data
@@ -0,0 +1,185 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record_stage(self.stage, time.perf_counter() - self.start, failed=exc_type is not None)
+        return False
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """Lightweight stage timings, histograms and counters for the recognition pipeline.
+
+    Disabled by default; while disabled ``span`` hands back a shared no-op context manager and the
+    other calls return immediately, so instrumented code pays one attribute check. Enable it with
+    ``MSEE_METRICS=prometheus:<file>`` (text exposition format, rewritten on ``export``) or
+    ``MSEE_METRICS=json:<file>`` (one JSON line appended per event).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.format = None
+        self.path = None
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.histograms = {}
+        self.counters = {}
+
+    def configure(self, spec):
+        """Enable from a ``<format>:<path>`` spec; an empty spec disables."""
+        if not spec:
+            self.enabled = False
+            return
+        self.format, _, self.path = spec.partition(":")
+        if self.format not in ("prometheus", "json") or not self.path:
+            raise ValueError(f"Invalid metrics spec: {spec}")
+        self.enabled = True
+
+    def configure_from_env(self):
+        self.configure(os.environ.get("MSEE_METRICS", ""))
+
+    def span(self, stage):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, stage)
+
+    def timed(self, stage):
+        """Decorator form of ``span`` for timing a whole function or slot."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_stage(self, stage, seconds, failed=False):
+        with self.lock:
+            self.stages.setdefault(stage, Histogram(STAGE_BUCKETS)).observe(seconds)
+        self.log({"event": "span", "stage": stage, "seconds": round(seconds, 6), "failed": failed})
+
+    def observe(self, name, value, buckets=COUNT_BUCKETS):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.histograms.setdefault(name, Histogram(buckets)).observe(value)
+        self.log({"event": "observe", "name": name, "value": value})
+
+    def increment(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def log(self, event):
+        if self.format != "json":
+            return
+        event["time"] = time.time()
+        with self.lock, open(self.path, "a", encoding="utf-8") as log_file:
+            log_file.write(json.dumps(event) + "\n")
+
+    def export(self):
+        """Write current counters (JSON) or the full Prometheus exposition to the configured file."""
+        if not self.enabled:
+            return
+        if self.format == "json":
+            with self.lock:
+                counters = dict(self.counters)
+            self.log({"event": "counters", "counters": counters})
+            return
+
+        text = self.prometheus_text()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(text)
+        os.replace(temp_path, self.path)
+
+    def prometheus_text(self):
+        lines = []
+        with self.lock:
+            if self.stages:
+                lines.append("# TYPE msee_stage_duration_seconds histogram")
+                for stage, histogram in sorted(self.stages.items()):
+                    lines.extend(histogram_lines("msee_stage_duration_seconds", histogram, f'stage="{stage}"'))
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f"# TYPE msee_{name} histogram")
+                lines.extend(histogram_lines(f"msee_{name}", histogram))
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE msee_{name}_total counter")
+                lines.append(f"msee_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+def percentiles(values):
+    """Summarise raw samples as p50/p95/p99 (linear interpolation) plus the sample count."""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "count": 0}
+    ordered = sorted(values)
+
+    def at(fraction):
+        position = (len(ordered) - 1) * fraction
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "count": len(ordered)}
+
+
+def histogram_lines(name, histogram, labels=""):
+    prefix = labels + "," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.total}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
+
+
+metrics = Metrics()  # Process-wide instance shared by the app and its services
@@ -0,0 +1,142 @@
+import re
+import threading
+
+import requests
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from services.Metrics import metrics
+
+PREFIX_KEY = "#prefix"  # Cache key suffix for entries holding only the start of a preview
+
+
+class PreviewLoader(QObject):
+    """Prefetch the start of each result's preview mp3 so playback starts from local disk.
+
+    ``prefetch`` fetches the first ``prefix_bytes`` of every URL with an HTTP range request;
+    ``fetch_rest`` completes a preview once it is actually played, requesting only the missing
+    bytes. Both end up in a size-bounded ``DiskCache`` (previews don't change, so entries are
+    never revalidated) and ``local_source`` reports the best copy on disk for the player.
+    """
+    preview_cached = pyqtSignal(str, bool)  # Signal carrying the URL and whether the whole file is now cached
+    preview_failed = pyqtSignal(str, str)  # Signal carrying the URL and the error message
+
+    def __init__(self, disk_cache, prefix_bytes=256 * 1024, max_workers=3, timeout=(3.05, 15), parent=None):
+        super().__init__(parent)
+        self.disk_cache = disk_cache
+        self.prefix_bytes = prefix_bytes  # About 16 s of a 128 kbps mp3
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self.timeout = timeout
+        self.local = threading.local()  # Sessions aren't thread-safe, so each pool thread keeps its own
+        self.pending = set()  # (url, complete) pairs queued or in flight
+        self.lock = threading.Lock()
+
+    def prefetch(self, urls):
+        for url in urls:
+            if url and self.local_source(url) is None:
+                self.start(url, complete=False)
+
+    def fetch_rest(self, url):
+        source = self.local_source(url)
+        if source is None or not source[1]:
+            self.start(url, complete=True)
+
+    @property
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def start(self, url, complete):
+        with self.lock:
+            if (url, complete) in self.pending:
+                return
+            self.pending.add((url, complete))
+        self.pool.start(PreviewTask(self, url, complete))
+
+    def local_source(self, url):
+        """Return ``(path, complete)`` for the best cached copy of a preview, or ``None``."""
+        path = self.disk_cache.locate(url)
+        if path is not None:
+            return path, True
+        path = self.disk_cache.locate(url + PREFIX_KEY)
+        if path is not None:
+            return path, False
+        return None
+
+    def download(self, url, first_byte, last_byte=None):
+        """Fetch a byte range; returns ``(data, complete)`` where data starts at ``first_byte``."""
+        byte_range = f"bytes={first_byte}-{'' if last_byte is None else last_byte}"
+        with metrics.span("preview_download"):
+            response = self.session.get(url, headers={"Range": byte_range}, timeout=self.timeout, stream=True)
+            try:
+                if response.status_code == 416:
+                    return b"", True  # Nothing left past first_byte
+                response.raise_for_status()  # Raise an exception for HTTP errors
+                ranged = response.status_code == 206
+                if last_byte is None:
+                    limit = None
+                else:
+                    # A server that ignores the range sends the body from byte zero
+                    limit = last_byte + 1 - (first_byte if ranged else 0)
+                data = read_up_to(response, limit)
+            finally:
+                response.close()
+        metrics.increment("bytes_received", len(data))
+
+        if not ranged:
+            return data[first_byte:], limit is None or len(data) < limit
+        total = content_range_total(response.headers.get("Content-Range"))
+        return data, total is not None and first_byte + len(data) >= total
+
+    def fetch(self, url, complete):
+        if not complete:
+            data, whole = self.download(url, 0, self.prefix_bytes - 1)
+            self.disk_cache.put(url if whole else url + PREFIX_KEY, data)
+            return whole
+
+        prefix_path = self.disk_cache.locate(url + PREFIX_KEY)
+        prefix = b""
+        if prefix_path is not None:
+            with open(prefix_path, "rb") as prefix_file:
+                prefix = prefix_file.read()
+        rest, _ = self.download(url, len(prefix))
+        self.disk_cache.put(url, prefix + rest)
+        self.disk_cache.discard(url + PREFIX_KEY)
+        return True
+
+
+class PreviewTask(QRunnable):
+    def __init__(self, loader, url, complete):
+        super().__init__()
+        self.loader = loader
+        self.url = url
+        self.complete = complete
+
+    def run(self):
+        try:
+            self.loader.preview_cached.emit(self.url, self.loader.fetch(self.url, self.complete))
+        except Exception as e:
+            self.loader.preview_failed.emit(self.url, str(e))
+        finally:
+            with self.loader.lock:
+                self.loader.pending.discard((self.url, self.complete))
+
+
+def read_up_to(response, limit=None):
+    """Read a streamed response body, stopping after ``limit`` bytes when given."""
+    chunks = []
+    received = 0
+    for chunk in response.iter_content(64 * 1024):
+        chunks.append(chunk)
+        received += len(chunk)
+        if limit is not None and received >= limit:
+            break
+    data = b"".join(chunks)
+    return data if limit is None else data[:limit]
+
+
+def content_range_total(header):
+    """Total size from a ``Content-Range: bytes 0-1023/4096`` header, or ``None`` when unknown."""
+    match = re.match(r"bytes \d+-\d+/(\d+)", header or "")
+    return int(match.group(1)) if match else None
@@ -0,0 +1,561 @@
+import queue
+import threading
+import time
+
+import numpy as np
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from services.AudioInput import AudioInput
+from services.FingerprintCache import song_key
+from services.Metrics import metrics
+from services.ResultWaiter import ResultWaiter
+from services.SongDataService import SongDataService
+
+
+class AudioRecorderThread(QThread):
+    recording_done = pyqtSignal(object, int)  # Signal to indicate recording is done, carrying samples and rate
+    error_occurred = pyqtSignal(str)  # Signal to indicate an error occurred
+    clip_rejected = pyqtSignal(str)  # Signal to indicate the clip was not worth uploading, with the reason
+
+    def __init__(self, audio_source=None, gate=None, audio_input=None, pre_roll=0.5):
+        super().__init__()
+        self.recorded_audio = None
+        self.gate = gate  # Optional AudioGate that rejects silent or non-music clips before upload
+        self.duration = 5  # Record for 5 seconds
+        # Shared, already running input stream; the clip is read out of its ring buffer
+        self.audio_input = audio_input if audio_input is not None else AudioInput()
+        self.sample_rate = self.audio_input.sample_rate
+        self.pre_roll = pre_roll  # Seconds from before the button press included in the clip
+        # Optional callable (frames, sample_rate) -> int16 samples used instead of the microphone,
+        # so benchmarks and evaluations can replay prerecorded clips through the same pipeline
+        self.audio_source = audio_source
+        # Two preallocated clips used in turn, so a new take never overwrites one still being processed
+        self.clips = []
+        self.next_clip_index = 0
+
+    def next_clip(self, frames):
+        if not self.clips or len(self.clips[0]) != frames:
+            self.clips = [np.empty((frames, 1), dtype=np.int16) for _ in range(2)]
+        clip = self.clips[self.next_clip_index]
+        self.next_clip_index = 1 - self.next_clip_index
+        return clip
+
+    def run(self):
+        duration = self.duration
+        sample_rate = self.sample_rate
+        frames = int(duration * sample_rate)
+
+        try:
+            with metrics.span("capture"):
+                if self.audio_source is not None:
+                    audio_data = self.audio_source(frames, sample_rate)
+                else:
+                    start = self.audio_input.mark(self.pre_roll)
+                    if not self.audio_input.wait_for(start + frames, timeout=duration + 5):
+                        raise RuntimeError("the input stream stopped delivering audio")
+                    audio_data = self.audio_input.read(start, frames, out=self.next_clip(frames))
+
+            # Keep the recorded audio in memory; the service encodes it for upload
+            self.recorded_audio = audio_data
+
+            if self.gate is not None:
+                reason = self.gate.check(audio_data, sample_rate)
+                if reason is not None:
+                    self.clip_rejected.emit(reason)
+                    return
+
+            # Emit signal to indicate recording is done
+            self.recording_done.emit(self.recorded_audio, sample_rate)
+
+        except Exception as e:
+            # Emit signal to indicate an error occurred
+            self.error_occurred.emit(f"Failed to record audio: {str(e)}")
+
+
+class ProcessingThread(QObject):
+    """Long-lived workers that process queued ``RecognitionJob``s.
+
+    The workers are created once and fed through ``submit``, so pressing the button no longer builds
+    a new thread (and service wiring) per recognition. ``workers`` threads share the queue, so a new
+    job starts straight away even while a cancelled one is still stuck in network I/O. Every signal
+    carries the job id, letting the UI drop results of jobs it has already cancelled or replaced.
+    """
+    processing_done = pyqtSignal(int, dict)  # Signal to indicate processing is done with response data
+    error_occurred = pyqtSignal(int, str)  # Signal to indicate an error occurred
+    timed_out = pyqtSignal(int)  # Signal to indicate no result arrived before the deadline
+
+    def __init__(self, service=None, fingerprint_cache=None, fallback_service=None, gate=None, workers=2):
+        super().__init__()
+        # Share the caller's service so its connection pool survives across recognitions
+        self.service = service if service is not None else SongDataService()
+        self.fingerprint_cache = fingerprint_cache
+        self.fallback_service = fallback_service  # Offline backend used when the API fails or times out
+        self.gate = gate  # Optional AudioGate checked before anything is uploaded
+        self.workers = workers
+        self.jobs = queue.Queue()
+        self.threads = []
+        self.running_jobs = set()
+        self.lock = threading.Lock()
+        self.local = threading.local()  # Per-worker state, such as the worker's ResultWaiter
+        self.poll_count = 0  # Result requests the most recently finished recognition needed
+
+    @property
+    def waiter(self):
+        """The calling worker's ``ResultWaiter``, rebuilt if ``service`` has been replaced."""
+        waiter = getattr(self.local, "waiter", None)
+        if waiter is None or waiter.service is not self.service:
+            waiter = self.local.waiter = ResultWaiter(self.service)
+        return waiter
+
+    def submit(self, job):
+        with self.lock:
+            if not self.threads:
+                self.threads = [threading.Thread(target=self.run, name=f"{type(self).__name__}-{index}", daemon=True)
+                                for index in range(self.workers)]
+                for thread in self.threads:
+                    thread.start()
+        self.jobs.put(job)
+
+    def shutdown(self):
+        """Cancel running jobs, abort their network requests and wait for every worker to exit.
+
+        The service is unusable afterwards, so this is only for when the app closes.
+        """
+        with self.lock:
+            threads, self.threads = self.threads, []
+            for job in self.running_jobs:
+                job.cancel()
+        for _ in threads:
+            self.jobs.put(None)
+        self.service.abort()  # Wakes workers blocked on an upload or a long poll
+        for thread in threads:
+            thread.join()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            if job.is_cancelled():
+                continue
+
+            with self.lock:
+                self.running_jobs.add(job)
+            try:
+                self.process(job)
+            except Exception as e:
+                self.fail(job, f"Failed to process audio: {str(e)}")
+            finally:
+                with self.lock:
+                    self.running_jobs.discard(job)
+
+    def process(self, job):
+        if job.audio_data is None:
+            self.fail(job, "No audio recorded")
+            return
+
+        reason = self.rejection_reason(job.audio_data, job.sample_rate)
+        if reason is not None:
+            self.fail(job, reason)
+            return
+
+        # Answer repeat queries of a recently recognised song without touching the network
+        fingerprint, cached_result = self.lookup_cached_result(job.audio_data, job.sample_rate)
+        if cached_result is not None:
+            self.finish(job, cached_result)
+            return
+
+        # Send the recorded audio to the service
+        response_data = self.service.send_recording(job.audio_data, job.sample_rate)
+        if job.is_cancelled():
+            return
+
+        if "error" in response_data:
+            if not self.recognize_offline(job, job.audio_data, fingerprint):
+                self.fail(job, response_data["error"])
+        else:
+            # Start polling for results
+            job_id = response_data.get("job_id")
+            token = response_data.get("token")
+            self.poll_results(job, job_id, token, hints=response_data, fingerprint=fingerprint,
+                              audio_data=job.audio_data)
+
+    def finish(self, job, result_data):
+        if not job.is_cancelled():
+            self.processing_done.emit(job.id, result_data)
+
+    def fail(self, job, error_message):
+        if not job.is_cancelled():
+            self.error_occurred.emit(job.id, error_message)
+
+    def rejection_reason(self, audio_data, sample_rate):
+        """Return why the gate rejects this audio, or ``None`` when it is worth uploading."""
+        if self.gate is None:
+            return None
+        return self.gate.check(audio_data, sample_rate)
+
+    def lookup_cached_result(self, audio_data, sample_rate):
+        if self.fingerprint_cache is None:
+            return None, None
+        fingerprint = self.fingerprint_cache.fingerprint(audio_data, sample_rate)
+        return fingerprint, self.fingerprint_cache.lookup(fingerprint)
+
+    def remember_result(self, fingerprint, result_data, waiter=None):
+        if self.fingerprint_cache is not None and fingerprint is not None:
+            # One upload plus however many result requests the network path needed
+            waiter = waiter if waiter is not None else self.waiter
+            self.fingerprint_cache.store(fingerprint, result_data, round_trips=1 + waiter.poll_count)
+
+    def recognize_offline(self, job, audio_data, fingerprint=None):
+        """Try the offline backend; returns True when it produced and emitted a result."""
+        if self.fallback_service is None or audio_data is None or not self.fallback_service.is_available():
+            return False
+        if job.is_cancelled():
+            return True  # Nobody is waiting for this result any more
+
+        response_data = self.fallback_service.send_recording(audio_data, job.sample_rate)
+        if "error" in response_data:
+            return False
+        result_data = self.fallback_service.get_result(response_data["job_id"], response_data["token"])
+        if "error" in result_data:
+            return False
+
+        self.remember_result(fingerprint, result_data)
+        self.finish(job, result_data)
+        return True
+
+    def poll_results(self, job, job_id, token, hints=None, fingerprint=None, audio_data=None):
+        with metrics.span("poll_results"):
+            result_data = self.wait_for_result(job, job_id, token, hints=hints)
+        self.poll_count = self.waiter.poll_count
+        metrics.observe("polls_per_recognition", self.poll_count)
+        if job.is_cancelled():
+            return
+
+        if (result_data is None or "error" in result_data) and self.recognize_offline(job, audio_data, fingerprint):
+            return
+
+        if result_data is None:
+            if not job.is_cancelled():
+                self.timed_out.emit(job.id)
+        elif "error" in result_data:
+            self.fail(job, result_data["error"])
+        else:
+            self.remember_result(fingerprint, result_data)
+
+            # Emit signal with the result data
+            self.finish(job, result_data)
+
+    def wait_for_result(self, job, job_id, token, deadline=None, hints=None):
+        """Wait until the job has results, fails, is cancelled, or its deadline passes.
+
+        ``deadline`` (monotonic time) can only shorten the job's own deadline. Returns the last
+        response, or ``None`` when the deadline was reached or the job was cancelled first.
+        """
+        deadline = job.deadline if deadline is None else min(deadline, job.deadline)
+        return self.waiter.wait(job_id, token, deadline, hints, cancelled=job.cancelled)
+
+
+class StreamingRecognitionThread(ProcessingThread):
+    """Record in short blocks and submit growing prefixes of the clip while recording continues.
+
+    At a checkpoint (in seconds) the audio captured so far is uploaded, and its result is waited
+    for in the background while recording goes on; as soon as a confident match comes back
+    capture ends, so most recognitions finish well before the full clip has been captured. A match
+    is confident when its score reaches ``min_score`` or, without a score, when it agrees with the
+    top match of an earlier prefix. An intermediate prefix is only uploaded while no other one is
+    still waiting for its answer, and at most ``max_uploads`` clips go out per press, the last
+    always being the full clip. Jobs submitted here carry no audio; prefixes are read from the
+    shared input stream into a clip buffer each worker allocates once.
+    """
+    recording_done = pyqtSignal(int)  # Signal to indicate capture stopped without an early match
+
+    def __init__(self, checkpoints=(2, 3, 4, 5), min_score=None, max_uploads=3, audio_input=None, pre_roll=0.5,
+                 service=None, fingerprint_cache=None, fallback_service=None, gate=None):
+        super().__init__(service=service, fingerprint_cache=fingerprint_cache, fallback_service=fallback_service,
+                         gate=gate)
+        self.checkpoints = checkpoints
+        self.audio_input = audio_input if audio_input is not None else AudioInput()
+        self.sample_rate = self.audio_input.sample_rate  # Capture rate for jobs created by the app
+        self.pre_roll = pre_roll  # Seconds from before the button press included in the clip
+        self.min_score = min_score  # Only applied when the server reports a score for the top match
+        self.max_uploads = max_uploads
+
+    def process(self, job):
+        sample_rate = self.audio_input.sample_rate
+        clip = getattr(self.local, "clip", None)
+        if clip is None:
+            clip = self.local.clip = np.empty((int(self.checkpoints[-1] * sample_rate), 1), dtype=np.int16)
+        try:
+            start = self.audio_input.mark(self.pre_roll)
+        except Exception as e:
+            self.fail(job, f"Failed to record audio: {str(e)}")
+            return
+
+        stop = threading.Event()  # Ends the background waits once this press is decided
+        results = queue.Queue()  # (is_last, fingerprint, waiter, result_data) from background waits
+        state = {"pending": 0, "uploads": 0, "polls": 0, "answers": []}
+        try:
+            for index, checkpoint in enumerate(self.checkpoints):
+                is_last = index == len(self.checkpoints) - 1
+
+                # Wait until enough audio has been captured for this checkpoint, taking early answers meanwhile.
+                # A healthy stream delivers the rest of the clip in real time; never wait past the job itself.
+                frames = int(checkpoint * sample_rate)
+                give_up_at = min(time.monotonic() + (start + frames - self.audio_input.frames_written) / sample_rate
+                                 + 5, job.deadline)
+                while not self.audio_input.wait_for(start + frames, cancelled=job.cancelled, timeout=0.05):
+                    if job.is_cancelled() or self.take_answers(job, results, state):
+                        return
+                    if time.monotonic() >= give_up_at:
+                        self.fail(job, "Failed to record audio: the input stream stopped delivering audio")
+                        return
+                if self.take_answers(job, results, state):
+                    return
+
+                # Skip intermediate prefixes while an earlier one is still being answered, and keep
+                # the last upload of the press for the full clip
+                if not is_last and (state["pending"] or state["uploads"] >= self.max_uploads - 1):
+                    continue
+
+                try:
+                    audio_data = self.audio_input.read(start, frames, out=clip)
+                except ValueError:
+                    # An upload stalled for longer than the ring buffer holds, and the clip start was overwritten
+                    self.fail(job, "Recording was overwritten while waiting for the network; please try again")
+                    return
+
+                # Skip prefixes that are silent or not music; only the full clip's rejection is final
+                reason = self.rejection_reason(audio_data, sample_rate)
+                if reason is not None:
+                    if is_last:
+                        self.fail(job, reason)
+                        return
+                    continue
+
+                if is_last:
+                    self.recording_done.emit(job.id)
+
+                fingerprint, cached_result = self.lookup_cached_result(audio_data, sample_rate)
+                if cached_result is not None:
+                    self.finish(job, cached_result)
+                    return
+
+                response_data = self.service.send_recording(audio_data, sample_rate)
+                state["uploads"] += 1
+                if job.is_cancelled():
+                    return
+
+                if "error" in response_data:
+                    if is_last:
+                        if not self.recognize_offline(job, audio_data, fingerprint):
+                            self.fail(job, response_data["error"])
+                        return
+                    continue
+                self.wait_in_background(job, stop, results, state, response_data, fingerprint, is_last)
+
+            # Recording is over: wait for the full clip, or for an earlier prefix to turn out confident
+            while state["pending"]:
+                try:
+                    answer = results.get(timeout=0.1)
+                except queue.Empty:
+                    if job.is_cancelled():
+                        return
+                    continue
+                if self.handle_answer(job, answer, state, audio_data):
+                    return
+        finally:
+            stop.set()
+            self.poll_count = state["polls"]
+            metrics.observe("polls_per_recognition", state["polls"])
+            metrics.observe("uploads_per_recognition", state["uploads"])
+
+    def wait_in_background(self, job, stop, results, state, response_data, fingerprint, is_last):
+        """Wait for one prefix's result on its own thread, reporting it (or ``None``) to ``results``."""
+        waiter = ResultWaiter(self.service)
+        state["pending"] += 1
+
+        def wait():
+            result_data = None
+            try:
+                result_data = waiter.wait(response_data.get("job_id"), response_data.get("token"), job.deadline,
+                                          response_data, cancelled=stop)
+            finally:
+                results.put((is_last, fingerprint, waiter, result_data))
+
+        threading.Thread(target=wait, name=f"{type(self).__name__}-prefix", daemon=True).start()
+
+    def take_answers(self, job, results, state):
+        """Handle answers that arrived while recording; returns True once the job is decided."""
+        while True:
+            try:
+                answer = results.get_nowait()
+            except queue.Empty:
+                return False
+            if self.handle_answer(job, answer, state):
+                return True
+
+    def handle_answer(self, job, answer, state, audio_data=None):
+        is_last, fingerprint, waiter, result_data = answer
+        state["pending"] -= 1
+        state["polls"] += waiter.poll_count
+        if job.is_cancelled():
+            return True
+
+        if not is_last:
+            if result_data is not None and self.is_confident(result_data, state["answers"]):
+                self.remember_result(fingerprint, result_data, waiter)
+                self.finish(job, result_data)
+                return True
+            key = self.top_key(result_data)
+            if key is not None:
+                state["answers"].append((key, result_data))
+            return False
+
+        # The full clip's answer is final, as in ProcessingThread.poll_results
+        if result_data is not None and "error" not in result_data:
+            self.remember_result(fingerprint, result_data, waiter)
+            self.finish(job, result_data)
+            return True
+        if self.recognize_offline(job, audio_data, fingerprint):
+            return True
+
+        if state["answers"]:
+            self.finish(job, state["answers"][-1][1])  # Better than nothing: the longest prefix that matched
+        elif result_data is None:
+            self.timed_out.emit(job.id)
+        else:
+            self.fail(job, result_data["error"])
+        return True
+
+    def is_confident(self, result_data, answers=()):
+        key = self.top_key(result_data)
+        if key is None:
+            return False
+        score = result_data["list_result"][0].get("score")
+        if self.min_score is not None and score is not None:
+            return score >= self.min_score
+        # Nothing to threshold: a short prefix alone often matches the wrong song, so wait for a second opinion
+        return any(key == answered_key for answered_key, _ in answers)
+
+    @staticmethod
+    def top_key(result_data):
+        if not result_data or "error" in result_data or not result_data.get("list_result"):
+            return None
+        return song_key(result_data["list_result"][0])
+
+
+class ContinuousRecognitionThread(ProcessingThread):
+    """Identify whatever is playing for as long as the job runs, without anyone pressing the button.
+
+    The shared input stream keeps a fixed-size ring buffer filled, and every ``hop`` seconds the
+    newest ``window`` seconds are submitted. Once a song is identified it is only re-checked every
+    ``confirm_interval`` seconds, unless a silence gap (a likely track change) is heard first.
+    Unrecognised windows back the hop off towards ``max_hop``, so uploads stay bounded when
+    nothing identifiable is playing. ``song_changed`` fires only when the top match changes.
+    """
+    song_changed = pyqtSignal(int, dict)  # Signal carrying the result for a newly identified song
+
+    def __init__(self, window=5, hop=10, confirm_interval=60, max_hop=120, audio_input=None, silence_rms=200,
+                 gap_duration=1.0, result_timeout=15, service=None, fingerprint_cache=None, fallback_service=None,
+                 gate=None):
+        super().__init__(service=service, fingerprint_cache=fingerprint_cache, fallback_service=fallback_service,
+                         gate=gate)
+        self.window = window
+        self.hop = hop
+        self.confirm_interval = confirm_interval
+        self.max_hop = max_hop
+        self.audio_input = audio_input if audio_input is not None else AudioInput()
+        self.sample_rate = self.audio_input.sample_rate  # Capture rate for jobs created by the app
+        self.silence_rms = silence_rms  # Block RMS (int16 scale) below which input counts as silence
+        self.gap_duration = gap_duration  # Seconds of silence treated as a boundary between tracks
+        self.result_timeout = result_timeout
+        self.submissions = 0
+        self.suppressed = 0  # Hops skipped because the identified song was still playing
+
+    def process(self, job):
+        audio_input = self.audio_input
+        sample_rate = audio_input.sample_rate
+        window_frames = int(self.window * sample_rate)
+        gap_frames = int(self.gap_duration * sample_rate)
+        clip = np.empty((window_frames, 1), dtype=np.int16)  # Reused for every submitted window
+        state = {"quiet_frames": 0, "boundary": None}
+
+        def on_block(indata, frame_count):
+            if np.sqrt(np.mean(np.square(indata, dtype=np.float32))) < self.silence_rms:
+                state["quiet_frames"] += frame_count
+            else:
+                if state["quiet_frames"] >= gap_frames:
+                    state["boundary"] = audio_input.frames_written - frame_count
+                state["quiet_frames"] = 0
+
+        try:
+            start = audio_input.mark()
+        except Exception as e:
+            self.fail(job, f"Failed to record audio: {str(e)}")
+            return
+        audio_input.add_listener(on_block)
+
+        current_key = None
+        misses = 0
+        next_at = start + window_frames  # Frame count at which the next window is submitted
+        try:
+            while not job.is_cancelled():
+                boundary = state["boundary"]
+                if boundary is not None and audio_input.frames_written >= boundary + window_frames:
+                    # A track change was heard; identify the new track as soon as a full window exists
+                    state["boundary"] = None
+                    next_at = min(next_at, boundary + window_frames)
+                if audio_input.frames_written < next_at:
+                    job.cancelled.wait(audio_input.block_duration)
+                    continue
+
+                submitted_at = audio_input.frames_written
+                result_data = self.recognize_window(job, audio_input.latest(window_frames, out=clip), sample_rate)
+                if job.is_cancelled():
+                    return
+
+                songs = (result_data or {}).get("list_result")
+                if songs:
+                    misses = 0
+                    key = song_key(songs[0])
+                    if key != current_key:
+                        current_key = key
+                        self.song_changed.emit(job.id, result_data)
+                    else:
+                        self.suppressed += 1
+                        metrics.increment("continuous_suppressed")
+                    interval = self.confirm_interval
+                else:
+                    misses += 1
+                    interval = min(self.hop * 2 ** (misses - 1), self.max_hop)
+                next_at = submitted_at + int(interval * sample_rate)
+
+        finally:
+            audio_input.remove_listener(on_block)
+
+    def recognize_window(self, job, audio_data, sample_rate):
+        """Return the result for one window, or ``None`` when it could not be identified."""
+        if self.rejection_reason(audio_data, sample_rate) is not None:
+            return None  # Silence or chatter between tracks; counts as a miss without an upload
+
+        fingerprint, cached_result = self.lookup_cached_result(audio_data, sample_rate)
+        if cached_result is not None:
+            return cached_result
+
+        self.submissions += 1
+        metrics.increment("continuous_submissions")
+        response_data = self.service.send_recording(audio_data, sample_rate)
+        if "error" in response_data:
+            # A failed window is just a miss; count it for the metrics rather than print from this thread
+            metrics.increment("continuous_upload_failures")
+            metrics.log({"event": "continuous_upload_failed", "job_id": job.id, "error": response_data["error"]})
+            return None
+
+        deadline = time.monotonic() + self.result_timeout
+        result_data = self.wait_for_result(job, response_data.get("job_id"), response_data.get("token"),
+                                           deadline, hints=response_data)
+        if result_data is None or "error" in result_data:
+            return None
+        self.remember_result(fingerprint, result_data)
+        return result_data
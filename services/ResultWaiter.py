@@ -0,0 +1,130 @@
+import time
+
+from services.Metrics import metrics
+
+
+class ResultWaiter:
+    """Wait for a recognition job's result using the cheapest mode the backend supports.
+
+    ``mode`` is one of ``'poll'``, ``'long_poll'``, ``'sse'`` or ``'auto'``. In auto mode the upload
+    response decides: an ``events_url`` selects server-sent events, a truthy ``long_poll`` selects
+    long-polling, anything else falls back to polling. Polling starts fast and backs off
+    exponentially, and a server ``retry_after`` hint always takes precedence over the schedule.
+    """
+
+    def __init__(self, service, mode='auto', timeout=30, first_interval=0.15, fast_polls=3, backoff=1.5,
+                 max_interval=2.0, long_poll_wait=10):
+        self.service = service
+        self.mode = mode
+        self.timeout = timeout  # Hard limit in seconds when no explicit deadline is given
+        self.first_interval = first_interval
+        self.fast_polls = fast_polls  # Polls at first_interval before backing off
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.long_poll_wait = long_poll_wait
+        self.poll_count = 0  # Requests made for the most recent job
+        self.cancelled = None
+
+    def wait(self, job_id, token, deadline=None, hints=None, cancelled=None):
+        """Return the result or error response, or ``None`` once ``deadline`` (monotonic time) passes.
+
+        Setting the optional ``cancelled`` event stops the wait early, also returning ``None``.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        hints = hints or {}
+        self.poll_count = 0
+        self.cancelled = cancelled
+
+        mode = self.mode
+        if mode == 'auto':
+            if hints.get("events_url"):
+                mode = 'sse'
+            elif hints.get("long_poll"):
+                mode = 'long_poll'
+            else:
+                mode = 'poll'
+
+        if mode == 'sse':
+            return self.wait_for_event(job_id, token, hints.get("events_url", "events"), deadline)
+        if mode == 'long_poll':
+            return self.long_poll(job_id, token, deadline)
+        return self.poll(job_id, token, deadline)
+
+    def poll(self, job_id, token, deadline):
+        interval = self.first_interval
+        while True:
+            result_data = self.service.get_result(job_id, token)
+            self.poll_count += 1
+
+            if is_finished(result_data):
+                return result_data
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.is_cancelled():
+                return None
+
+            delay = retry_after(result_data)
+            if delay is None:
+                delay = interval
+            if self.poll_count >= self.fast_polls:
+                interval = min(interval * self.backoff, self.max_interval)
+
+            if self.sleep(min(delay, remaining)):
+                return None
+
+    def long_poll(self, job_id, token, deadline):
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.is_cancelled():
+                return None
+
+            started = time.monotonic()
+            result_data = self.service.get_result(job_id, token, wait=min(self.long_poll_wait, remaining))
+            self.poll_count += 1
+
+            if is_finished(result_data):
+                return result_data
+
+            # A server that ignores the wait parameter answers straight away; don't spin on it
+            if time.monotonic() - started < self.first_interval:
+                return self.poll(job_id, token, deadline)
+
+    def wait_for_event(self, job_id, token, events_url, deadline):
+        try:
+            for event in self.service.stream_result_events(events_url, job_id, token,
+                                                           deadline - time.monotonic()):
+                if is_finished(event):
+                    return event
+                if time.monotonic() >= deadline or self.is_cancelled():
+                    return None
+        except Exception as e:
+            # Runs on a worker thread; record the fallback rather than print it
+            metrics.increment("result_stream_failures")
+            metrics.log({"event": "result_stream_failed", "job_id": job_id, "error": str(e)})
+
+        if time.monotonic() >= deadline or self.is_cancelled():
+            return None
+        return self.poll(job_id, token, deadline)
+
+    def is_cancelled(self):
+        return self.cancelled is not None and self.cancelled.is_set()
+
+    def sleep(self, seconds):
+        """Sleep between polls, waking early on cancellation; returns True if cancelled."""
+        if self.cancelled is None:
+            time.sleep(seconds)
+            return False
+        return self.cancelled.wait(seconds)
+
+
+def is_finished(result_data):
+    return "error" in result_data or bool(result_data.get("list_result"))
+
+
+def retry_after(result_data):
+    value = result_data.get("retry_after")
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except (TypeError, ValueError):
+        return None
@@ -1,34 +1,201 @@
 import requests
 import json
+import socket
+import time
+import weakref
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.AudioEncoder import AudioEncoder, EncodedAudio
+from services.Fingerprinter import encode_fingerprint
+from services.Metrics import metrics
+
+
+class UploadRetry(Retry):
+    """Retry a status from ``status_forcelist`` only when the response carries ``Retry-After``."""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        return has_retry_after and super().is_retry(method, status_code, has_retry_after)
+
+
+class AbortableAdapter(HTTPAdapter):
+    """``HTTPAdapter`` whose requests can be failed from another thread.
+
+    Every connection it opens is remembered, so ``abort`` can shut their sockets down and wake
+    threads blocked on a slow upload or a long poll; connections opened afterwards fail at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.connections = weakref.WeakSet()
+        self.aborted = False
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # PoolManager keeps its pool classes per instance so they can be overridden
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: tracking_pool(pool_class, self)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()}
+
+    def abort(self):
+        self.aborted = True
+        for connection in list(self.connections):
+            sock = connection.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+def tracking_pool(pool_class, adapter):
+    """Subclass of a urllib3 connection pool whose connections register with ``adapter``."""
+    class TrackingConnection(pool_class.ConnectionCls):
+        def connect(self):
+            if adapter.aborted:
+                raise RuntimeError("the service was shut down")  # Not an OSError, so urllib3 won't retry it
+            super().connect()
+            adapter.connections.add(self)
+
+    return type(pool_class.__name__, (pool_class,), {"ConnectionCls": TrackingConnection})
 
 
 class SongDataService:
-    def __init__(self):
-        self.api_url = 'https://msee-api.mse19hn.com/recognize'
+    def __init__(self, api_url='https://msee-api.mse19hn.com/recognize', pool_size=4, connect_timeout=3.05,
+                 read_timeout=15, max_retries=3, backoff_factor=0.3, backoff_jitter=0.2, encoder=None,
+                 upload_mode='audio', fingerprint_endpoint='upload_fingerprint'):
+        self.api_url = api_url
+        self.upload_mode = upload_mode  # 'audio' uploads the clip, 'fingerprint' only its landmark hashes
+        self.fingerprint_endpoint = fingerprint_endpoint
+        self.timeout = (connect_timeout, read_timeout)
+        self.encoder = encoder if encoder is not None else AudioEncoder()
+        self.last_encoded = None
 
-    def send_audio(self, audio_file_path):
+        # One long-lived session so uploads and polls reuse keep-alive connections across recognitions.
+        # Result polls are idempotent, so they are retried on read errors and 5xx answers too.
+        result_retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=None,  # The API is POST-only; retry those as well
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        # An upload that reached the server may already have created a job, so it is only retried
+        # when it never left (connect errors) or the server explicitly asked for it later
+        upload_retry = UploadRetry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            other=0,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=(429, 503),
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        # Each policy gets its own adapter, and so its own connection pool
+        adapter = AbortableAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=upload_retry)
+        result_adapter = AbortableAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=result_retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.mount(f"{api_url}/result", result_adapter)  # The longest matching prefix wins
+
+    def close(self):
+        self.session.close()
+
+    def abort(self):
+        """Fail every request in flight, and any made later; for shutting down without waiting on the network."""
+        for adapter in self.session.adapters.values():
+            if isinstance(adapter, AbortableAdapter):
+                adapter.abort()
+
+    def send_recording(self, audio_data, sample_rate):
+        """Encode a captured buffer with the configured codec, or fingerprint it, and upload it."""
+        with metrics.span("encode"):
+            if self.upload_mode == 'fingerprint':
+                encoded = encode_fingerprint(audio_data, sample_rate)
+            else:
+                encoded = self.encoder.encode(audio_data, sample_rate)
+        self.last_encoded = encoded
+        metrics.increment(f"uploads_{encoded.codec}")
+
+        start = time.perf_counter()
+        with metrics.span("upload"):
+            response_data = self.send_audio(encoded)
+        # Fingerprints are far smaller than any audio, so they would skew the uplink estimate
+        if "error" not in response_data and encoded.codec != 'fingerprint':
+            self.encoder.record_upload(len(encoded.data), time.perf_counter() - start)
+        return response_data
+
+    def send_audio(self, audio):
         try:
-            with open(audio_file_path, 'rb') as audio_file:
-                files = {'file': ('recorded_audio.wav', audio_file, 'audio/wav')}
-                response = requests.post(f"{self.api_url}/upload", files=files)
-
-                # Check if the response is successful
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    return {"error": "Failed to upload audio"}
+            # Plain bytes are taken to be WAV data; encoded audio carries its own name and type
+            endpoint = "upload"
+            if isinstance(audio, EncodedAudio):
+                files = {'file': (audio.filename, audio.data, audio.mime_type)}
+                if audio.codec == 'fingerprint':
+                    endpoint = self.fingerprint_endpoint
+            else:
+                files = {'file': ('recorded_audio.wav', audio, 'audio/wav')}
+            response = self.session.post(f"{self.api_url}/{endpoint}", files=files, timeout=self.timeout)
+            metrics.increment("bytes_sent", len(response.request.body or b""))
+            metrics.increment("bytes_received", len(response.content))
+
+            # Check if the response is successful
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {"error": "Failed to upload audio"}
+        except requests.Timeout:
+            return {"error": "Timed out uploading audio"}
         except Exception as e:
             return {"error": f"Error in uploading audio"}
 
-    def get_result(self, job_id, token):
+    def get_result(self, job_id, token, wait=None):
         try:
             headers = {'Content-Type': 'application/json'}
-            payload = json.dumps({"job_id": job_id, "token": token})
-            response = requests.post(f"{self.api_url}/result", headers=headers, data=payload)
+            body = {"job_id": job_id, "token": token}
+            timeout = self.timeout
+            if wait is not None:
+                # Long-poll: ask the server to hold the request until the result is ready
+                body["wait"] = wait
+                timeout = (self.timeout[0], self.timeout[1] + wait)
+            payload = json.dumps(body)
+            response = self.session.post(f"{self.api_url}/result", headers=headers, data=payload,
+                                         timeout=timeout)
+            metrics.increment("result_requests")
+            metrics.increment("bytes_sent", len(payload))
+            metrics.increment("bytes_received", len(response.content))
 
             if response.status_code == 200:
-                return response.json()
+                result_data = response.json()
+                if "Retry-After" in response.headers and "retry_after" not in result_data:
+                    result_data["retry_after"] = response.headers["Retry-After"]
+                return result_data
             else:
                 return {"error": "Failed to fetch song result"}
+        except requests.Timeout:
+            return {"error": "Timed out fetching song result"}
         except Exception as e:
             return {"error": f"Error in fetching song result"}
+
+    def stream_result_events(self, events_url, job_id, token, timeout):
+        """Yield the JSON payloads pushed by the server over a server-sent events stream."""
+        url = urljoin(f"{self.api_url}/", events_url)
+        response = self.session.get(url, params={"job_id": job_id, "token": token},
+                                    headers={'Accept': 'text/event-stream'}, stream=True,
+                                    timeout=(self.timeout[0], max(timeout, 0.1)))
+        with response:
+            response.raise_for_status()
+            data_lines = []
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("data:"):
+                    data_lines.append(line[5:].strip())
+                elif not line and data_lines:
+                    yield json.loads("\n".join(data_lines))
+                    data_lines = []
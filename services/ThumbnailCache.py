@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class PixmapCache:
+    """Size-bounded LRU of decoded, pre-scaled pixmaps keyed by ``(url, size)``.
+
+    Only touched from the GUI thread, so it needs no locking.
+    """
+
+    def __init__(self, max_items=200):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        pixmap = self.items.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return pixmap
+
+    def put(self, key, pixmap):
+        self.items[key] = pixmap
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+    def stats(self):
+        return {"memory_hits": self.hits, "memory_misses": self.misses, "memory_items": len(self.items)}
+
+
+class DiskCache:
+    """Persistent store of downloaded bytes keyed by URL, evicted least-recently-used first.
+
+    Each entry is a ``<sha1><suffix>`` payload (``.img`` by default) plus a ``<sha1>.json`` sidecar holding the ``ETag`` and
+    ``Last-Modified`` validators and the time it was last confirmed fresh. Access times are kept in
+    the payload's mtime so eviction order survives restarts.
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, max_age=24 * 3600, suffix=".img"):
+        self.directory = directory
+        self.suffix = suffix  # Payload extension; players that sniff formats by name need a real one
+        self.max_bytes = max_bytes
+        self.max_age = max_age  # Seconds an entry is served without revalidation
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def paths(self, url):
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + self.suffix), os.path.join(self.directory, name + ".json")
+
+    def get(self, url):
+        """Return ``(data, meta)`` for a cached URL, or ``None``. ``meta['fresh']`` tells whether to revalidate."""
+        data_path, meta_path = self.paths(url)
+        with self.lock:
+            try:
+                with open(data_path, "rb") as data_file:
+                    data = data_file.read()
+                with open(meta_path, "r", encoding="utf-8") as meta_file:
+                    meta = json.load(meta_file)
+                os.utime(data_path)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+            self.hits += 1
+        meta["fresh"] = time.time() - meta.get("checked", 0) < self.max_age
+        return data, meta
+
+    def locate(self, url):
+        """Return the payload path of a cached URL for reading in place, or ``None``."""
+        data_path, meta_path = self.paths(url)
+        with self.lock:
+            try:
+                os.utime(data_path)
+            except OSError:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return data_path
+
+    def put(self, url, data, etag=None, last_modified=None):
+        data_path, meta_path = self.paths(url)
+        meta = {"url": url, "etag": etag, "last_modified": last_modified, "checked": time.time()}
+        with self.lock:
+            with open(data_path, "wb") as data_file:
+                data_file.write(data)
+            with open(meta_path, "w", encoding="utf-8") as meta_file:
+                json.dump(meta, meta_file)
+            self.evict()
+
+    def discard(self, url):
+        with self.lock:
+            for path in self.paths(url):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def mark_fresh(self, url):
+        """Record a successful revalidation (HTTP 304) for a cached URL."""
+        data_path, meta_path = self.paths(url)
+        with self.lock:
+            self.revalidations += 1
+            try:
+                with open(meta_path, "r", encoding="utf-8") as meta_file:
+                    meta = json.load(meta_file)
+                meta["checked"] = time.time()
+                with open(meta_path, "w", encoding="utf-8") as meta_file:
+                    json.dump(meta, meta_file)
+            except (OSError, ValueError):
+                pass
+
+    def evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            for victim in (path, path[:-len(self.suffix)] + ".json"):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+
+    def stats(self):
+        return {"disk_hits": self.hits, "disk_misses": self.misses, "disk_revalidations": self.revalidations}
@@ -0,0 +1,76 @@
+import threading
+
+import requests
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from services.Metrics import metrics
+
+
+class ThumbnailLoader(QObject):
+    """Download and decode album art on a thread pool, emitting each image as it arrives.
+
+    Decoding happens in the workers into a ``QImage`` (safe off the GUI thread); the GUI converts
+    it to a ``QPixmap`` when the ``thumbnail_loaded`` signal is delivered.
+    """
+    thumbnail_loaded = pyqtSignal(str, QImage)  # Signal carrying the URL and its decoded image
+    thumbnail_failed = pyqtSignal(str, str)  # Signal carrying the URL and the error message
+
+    def __init__(self, max_workers=6, timeout=(3.05, 10), disk_cache=None, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self.timeout = timeout
+        self.disk_cache = disk_cache
+        self.local = threading.local()  # Sessions aren't thread-safe, so each pool thread keeps its own
+
+    @property
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def load(self, url):
+        self.pool.start(ThumbnailTask(self, url))
+
+    def fetch(self, url):
+        cached = self.disk_cache.get(url) if self.disk_cache is not None else None
+        if cached is not None and cached[1]["fresh"]:
+            return cached[0]
+
+        # Stale entries are revalidated with their validators instead of downloaded again
+        headers = {}
+        if cached is not None:
+            if cached[1].get("etag"):
+                headers["If-None-Match"] = cached[1]["etag"]
+            if cached[1].get("last_modified"):
+                headers["If-Modified-Since"] = cached[1]["last_modified"]
+
+        with metrics.span("thumbnail_download"):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        metrics.increment("bytes_received", len(response.content))
+        if response.status_code == 304 and cached is not None:
+            self.disk_cache.mark_fresh(url)
+            return cached[0]
+        response.raise_for_status()  # Raise an exception for HTTP errors
+
+        if self.disk_cache is not None:
+            self.disk_cache.put(url, response.content, response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"))
+        return response.content
+
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, loader, url):
+        super().__init__()
+        self.loader = loader
+        self.url = url
+
+    def run(self):
+        try:
+            image = QImage()
+            if not image.loadFromData(self.loader.fetch(self.url)):
+                raise ValueError("unsupported image data")
+            self.loader.thumbnail_loaded.emit(self.url, image)
+        except Exception as e:
+            self.loader.thumbnail_failed.emit(self.url, str(e))